@@ -0,0 +1,117 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Longer histories are averaged into this many buckets before plotting
+MAX_CHART_POINTS = 500
+# From this many points on, traces render with WebGL instead of SVG
+WEBGL_MIN_POINTS = 300
+
+ACCENT = "#dc143c"
+ACCENT_DARK = "#8b0000"
+DIFFICULTY_ORDER = ("easy", "intermediate", "hard")
+
+
+def _layout(fig, title, **kwargs):
+    fig.update_layout(
+        title=title,
+        template="plotly_dark",
+        paper_bgcolor="#0d0d0d",
+        plot_bgcolor="#1a1a1a",
+        margin=dict(l=40, r=20, t=50, b=40),
+        **kwargs
+    )
+    return fig
+
+
+def downsample(values, max_points=MAX_CHART_POINTS):
+    # Returns (x, y): 1-based positions and values, or bucket centres and bucket means
+    values = np.asarray(values, dtype=float)
+    count = len(values)
+    if count <= max_points:
+        return np.arange(1, count + 1), values
+    edges = np.linspace(0, count, max_points + 1).astype(int)
+    means = np.add.reduceat(values, edges[:-1]) / np.diff(edges)
+    return (edges[:-1] + edges[1:] + 1) / 2, means
+
+
+def score_history_figure(percentages, topics=None):
+    x, y = downsample(percentages)
+    bucketed = len(y) < len(percentages)
+    trace = go.Scattergl if len(x) >= WEBGL_MIN_POINTS else go.Scatter
+    fig = go.Figure(trace(
+        x=x,
+        y=y,
+        mode="lines" if bucketed else "lines+markers",
+        line=dict(color=ACCENT),
+        # Per-quiz topics only make sense when every point is a single quiz
+        text=None if bucketed or topics is None else topics,
+        hovertemplate=("Quizzes ~%{x:.0f}: %{y:.0f}%" if bucketed else "Quiz %{x}: %{y:.0f}%<br>%{text}") + "<extra></extra>"
+    ))
+    title = "Score over time" + (f" (average of every ~{len(percentages) / len(y):.0f} quizzes)" if bucketed else "")
+    return _layout(fig, title, xaxis_title="Quiz", yaxis=dict(title="Score (%)", range=[0, 105]))
+
+
+def topic_mastery_figure(topic_stats, max_topics=30):
+    # topic_stats: {topic: {"mean", "best", "attempts", ...}}; weakest topics first
+    ranked = sorted(topic_stats.items(), key=lambda item: item[1]["mean"])[:max_topics]
+    names = [name for name, _stats in ranked]
+    fig = go.Figure([
+        go.Bar(y=names, x=[s["mean"] for _n, s in ranked], name="Mean", orientation="h", marker_color=ACCENT,
+               customdata=[s["attempts"] for _n, s in ranked],
+               hovertemplate="%{y}: %{x:.0f}% over %{customdata} quiz(zes)<extra></extra>"),
+        go.Bar(y=names, x=[s["best"] for _n, s in ranked], name="Best", orientation="h", marker_color=ACCENT_DARK,
+               hovertemplate="%{y}: best %{x:.0f}%<extra></extra>")
+    ])
+    return _layout(
+        fig, "Topic mastery", barmode="group",
+        xaxis=dict(title="Score (%)", range=[0, 105]),
+        yaxis=dict(autorange="reversed"),
+        height=max(300, 40 * len(names) + 100)
+    )
+
+
+def difficulty_figure(difficulty_stats):
+    ordered = [d for d in DIFFICULTY_ORDER if d in difficulty_stats]
+    ordered += sorted(d for d in difficulty_stats if d not in DIFFICULTY_ORDER)
+    fig = go.Figure(go.Bar(
+        x=[d.capitalize() for d in ordered],
+        y=[difficulty_stats[d]["mean"] for d in ordered],
+        customdata=[difficulty_stats[d]["attempts"] for d in ordered],
+        marker_color=ACCENT,
+        hovertemplate="%{x}: %{y:.0f}% over %{customdata} quiz(zes)<extra></extra>"
+    ))
+    return _layout(fig, "Score by difficulty", yaxis=dict(title="Mean score (%)", range=[0, 105]))
+
+
+def difficulty_heatmap_figure(matrix):
+    # matrix: topics x difficulties of mean scores (NaN where nobody attempted that pair)
+    columns = [d for d in DIFFICULTY_ORDER if d in matrix.columns]
+    columns += sorted(d for d in matrix.columns if d not in DIFFICULTY_ORDER)
+    matrix = matrix[columns]
+    fig = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(),
+        x=[d.capitalize() for d in columns],
+        y=list(matrix.index),
+        zmin=0,
+        zmax=100,
+        colorscale=[[0, ACCENT_DARK], [0.5, "#e8a33d"], [1, "#2e8b57"]],
+        colorbar=dict(title="Mean %"),
+        hovertemplate="%{y} (%{x}): %{z:.0f}%<extra></extra>"
+    ))
+    return _layout(
+        fig, "Mean score by topic and difficulty",
+        yaxis=dict(autorange="reversed"),
+        height=max(300, 25 * len(matrix.index) + 120)
+    )
+
+
+def score_distribution_figure(histogram):
+    width = 100 / len(histogram)
+    labels = [f"{i * width:.0f}-{(i + 1) * width:.0f}%" for i in range(len(histogram))]
+    fig = go.Figure(go.Bar(
+        x=labels,
+        y=histogram,
+        marker_color=ACCENT,
+        hovertemplate="%{x}: %{y} quiz(zes)<extra></extra>"
+    ))
+    return _layout(fig, "Score distribution", xaxis_title="Score", yaxis_title="Quizzes")
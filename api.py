@@ -0,0 +1,193 @@
+import hmac
+import os
+import re
+from typing import Any
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from llm_client import LLMUnavailableError
+from llm_json import validate_question
+from pdf_ingest import UnreadablePdfError
+from tutor_service import QUIZ_KINDS, create_service, score_quiz
+
+# Run with: uvicorn api:app --workers N
+# Endpoints are plain functions, so FastAPI runs them on its thread pool; the service
+# components are thread-safe and shared by every request in the worker.
+load_dotenv()
+
+# Document ids are the SHA-256 of the uploaded PDF; anything else never reaches the store
+DOC_ID_RE = re.compile(r"[0-9a-f]{64}")
+
+service = create_service()
+app = FastAPI(title="Biotech Learning Platform API")
+
+
+class AskRequest(BaseModel):
+    question: str = Field(min_length=1)
+
+
+class TextRequest(BaseModel):
+    stream: bool = False
+
+
+class SummaryRequest(TextRequest):
+    # Summaries fan out over the caller's executor slots, so each caller needs its own id
+    user_id: str = Field(min_length=1)
+
+
+class ExplainRequest(TextRequest):
+    topic: str = Field(min_length=1)
+
+
+class HistoryTurn(BaseModel):
+    q: str
+    a: str
+
+
+class StudyQuestionRequest(TextRequest):
+    topic: str = Field(min_length=1)
+    question: str = Field(min_length=1)
+    history: list[HistoryTurn] = []
+
+
+class QuizRequest(BaseModel):
+    user_id: str = Field(min_length=1)
+    topic: str = Field(min_length=1)
+    difficulty: str = "Medium"
+    type: str = "mcq"
+    count: int = Field(default=5, ge=1, le=20)
+
+
+class ScoreRequest(BaseModel):
+    questions: list[dict[str, Any]]
+    answers: dict[int, Any] | list[Any]
+
+
+class SuggestionsRequest(TextRequest):
+    studied_topics: list[str] = Field(min_length=1)
+
+
+class FeedbackRequest(TextRequest):
+    learning_path: list[Any] = []
+    quiz_scores: list[dict[str, Any]] = []
+
+
+@app.exception_handler(LLMUnavailableError)
+def llm_unavailable(request, exc):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+def text_response(result, stream):
+    if stream:
+        return StreamingResponse(result, media_type="text/plain; charset=utf-8")
+    return {"text": result}
+
+
+def require_document(doc_id):
+    if not DOC_ID_RE.fullmatch(doc_id) or not service.document_store.exists(doc_id):
+        raise HTTPException(status_code=404, detail="Unknown document; upload it again")
+
+
+def require_admin(token):
+    # Same ADMIN_TOKEN as the app's instructor views; without it set, admin endpoints are closed
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected or not hmac.compare_digest(token or "", expected):
+        raise HTTPException(status_code=403, detail="Instructor access required")
+
+
+def require_biotech(topic):
+    if not service.is_biotech_related(topic):
+        raise HTTPException(status_code=422, detail="This topic is not related to biotechnology")
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "llm_cache": service.llm_cache.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus scrape target for the per-call LLM metrics
+    return PlainTextResponse(service.metrics.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cohort")
+def cohort(weakest: int = 10, x_admin_token: str | None = Header(default=None)):
+    # Every learner's results: instructors only, with the token in an X-Admin-Token header
+    require_admin(x_admin_token)
+    return service.cohort_report(weakest)
+
+
+@app.post("/documents")
+async def upload_document(request: Request):
+    # The request body is the PDF itself (Content-Type: application/pdf)
+    data = await request.body()
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty request body")
+    try:
+        doc_id, page_offsets, failed_pages = await run_in_threadpool(service.ingest_document, data)
+    except UnreadablePdfError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return {"doc_id": doc_id, "pages": len(page_offsets), "failed_pages": failed_pages}
+
+
+@app.post("/documents/{doc_id}/ask")
+def ask_document(doc_id: str, body: AskRequest):
+    require_document(doc_id)
+    return service.answer_from_document(doc_id, body.question)
+
+
+@app.post("/documents/{doc_id}/summary")
+def summarize_document(doc_id: str, body: SummaryRequest):
+    require_document(doc_id)
+    return text_response(service.summarize_document(doc_id, stream=body.stream, user_id=body.user_id), body.stream)
+
+
+@app.post("/explain")
+def explain(body: ExplainRequest):
+    require_biotech(body.topic)
+    return text_response(service.explain_topic(body.topic, stream=body.stream), body.stream)
+
+
+@app.post("/study/ask")
+def study_question(body: StudyQuestionRequest):
+    return text_response(service.answer_study_question(body.topic, body.question, [turn.model_dump() for turn in body.history], stream=body.stream), body.stream)
+
+
+@app.get("/resources")
+def resources(topic: str, refresh: bool = False):
+    return {"resources": service.fetch_learning_resources(topic, refresh=refresh) or []}
+
+
+@app.post("/quiz")
+def quiz(body: QuizRequest):
+    if body.type not in QUIZ_KINDS:
+        raise HTTPException(status_code=422, detail=f"type must be one of {', '.join(QUIZ_KINDS)}")
+    questions = service.serve_quiz(body.user_id, body.topic, body.difficulty, body.type, body.count)
+    if not questions:
+        raise HTTPException(status_code=502, detail="Failed to generate quiz")
+    return {"questions": questions}
+
+
+@app.post("/quiz/score")
+def score(body: ScoreRequest):
+    questions = [validate_question(q) for q in body.questions]
+    if None in questions:
+        raise HTTPException(status_code=422, detail="Malformed question in quiz")
+    return score_quiz(questions, body.answers)
+
+
+@app.post("/suggestions")
+def suggestions(body: SuggestionsRequest):
+    return text_response(service.suggest_topics(body.studied_topics, stream=body.stream), body.stream)
+
+
+@app.post("/feedback")
+def feedback(body: FeedbackRequest):
+    if not body.learning_path and not body.quiz_scores:
+        raise HTTPException(status_code=422, detail="Complete some modules and quizzes first")
+    return text_response(service.feedback(body.learning_path, body.quiz_scores, stream=body.stream), body.stream)
@@ -1,104 +1,137 @@
 import streamlit as st
-import os
 from dotenv import load_dotenv
-from groq import Groq
-import plotly.graph_objects as go
-import json
+import hmac
+import os
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from PyPDF2 import PdfReader
+from analytics_charts import (
+    difficulty_figure,
+    difficulty_heatmap_figure,
+    score_distribution_figure,
+    score_history_figure,
+    topic_mastery_figure
+)
+from llm_client import LLMUnavailableError
+from pdf_ingest import UnreadablePdfError
+from quiz_batch import export_batch, run_quiz_batch
+from session_analytics import average_score, record_attempt, topic_attempts
+from session_store import empty_session
+from tutor_service import QUIZ_TYPES, create_service, new_topic_entry, score_quiz
 
 load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
-def call_llm(prompt, system_msg="You are a biotechnology expert tutor."):
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return response.choices[0].message.content
+@st.cache_resource
+def get_tutor_service():
+    # One service per process: the LLM client, caches, stores and executor are shared by every session
+    return create_service()
 
-def is_biotech_related(query):
-    prompt = f"""Is this question related to biotechnology? Answer ONLY 'yes' or 'no'.
-Question: {query}"""
-    response = call_llm(prompt, "You are a classifier. Answer only 'yes' or 'no'.")
-    return "yes" in response.lower()
+service = get_tutor_service()
+llm_cache = service.llm_cache
+llm_executor = service.llm_executor
+document_store = service.document_store
+session_store = service.session_store
+quiz_bank = service.quiz_bank
 
-def extract_pdf_text(pdf_file):
+@contextmanager
+def llm_errors():
+    # LLMUnavailableError means the client's retries and fallback models are exhausted; show a hint, not a traceback
     try:
-        pdf_reader = PdfReader(pdf_file)
-        pages_content = []
-        for i, page in enumerate(pdf_reader.pages):
-            text = page.extract_text()
-            pages_content.append({"page": i+1, "text": text})
-        return pages_content
-    except:
-        return []
+        yield
+    except LLMUnavailableError:
+        st.error("⚠️ The AI service couldn't respond right now. Please try again in a moment.")
+
+def serve_quiz(topic, difficulty, qtype, count):
+    user_id = st.session_state.user_id
+    questions = service.banked_quiz(user_id, topic, difficulty, qtype, count)
+    if questions is None:
+        with st.status("Creating quiz...", expanded=True) as status:
+            questions = service.create_quiz(
+                user_id, topic, difficulty, qtype, count, stream=True,
+                on_question=lambda q: st.write(f"✅ {q['question']}")
+            )
+            status.update(label=f"Created {len(questions)} questions", state="complete" if questions else "error")
+    service.schedule_quiz_refill(topic, difficulty, qtype)
+    return questions
+
+def load_pdf(uploaded_file, progress_bar):
+    doc_id, page_offsets, failed_pages = service.ingest_document(
+        uploaded_file.getvalue(),
+        progress=lambda done, total: progress_bar.progress(done / total, text=f"Extracted {done} of {total} pages...")
+    )
+    if failed_pages:
+        st.warning(f"⚠️ Could not read text from page(s) {', '.join(str(p) for p in failed_pages)}.")
+    return doc_id, page_offsets
 
 def init_session():
+    # st.session_state.sessions only holds the hydrated active session; the store has the full list
     if "sessions" not in st.session_state:
         st.session_state.sessions = {}
     if "current_session_id" not in st.session_state:
         st.session_state.current_session_id = None
+    if "user_id" not in st.session_state:
+        # Kept in the URL so a reload (or a different app process) finds the same sessions
+        user_id = st.query_params.get("uid") or uuid.uuid4().hex
+        st.query_params["uid"] = user_id
+        st.session_state.user_id = user_id
     
-    if not st.session_state.sessions and st.session_state.current_session_id is None:
-        session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        st.session_state.sessions[session_id] = {
-            "name": "Study Session 1",
-            "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
-            "learning_path": [],
-            "quiz_scores": [],
-            "topic_performance": {},
-            "pdf_content": [],
-            "pdf_full_text": "",
-            "chat_history": [],
-            "current_study_topic": None,
-            "study_conversation": [],
-            "topic_history": {},
-            "quiz_data": None,
-            "user_answers": {},
-            "recommended_topics": []
-        }
-        st.session_state.current_session_id = session_id
+    if st.session_state.current_session_id is None:
+        existing = session_store.list_sessions(st.session_state.user_id)
+        if existing:
+            st.session_state.current_session_id = existing[-1]["id"]
+        else:
+            create_new_session()
 
 def get_current_session():
-    if st.session_state.current_session_id:
-        return st.session_state.sessions.get(st.session_state.current_session_id, None)
-    return None
+    session_id = st.session_state.current_session_id
+    if not session_id:
+        return None
+    session = st.session_state.sessions.get(session_id)
+    if session is None:
+        session = session_store.load_session(session_id)
+        if session is not None:
+            if session["pdf_doc_id"] and not document_store.exists(session["pdf_doc_id"]):
+                # The document was collected or lives on another host's disk; ask for a re-upload
+                session["pdf_doc_id"], session["pdf_pages"], session["pdf_file_id"] = None, [], None
+            st.session_state.sessions = {session_id: session}
+    return session
 
 def create_new_session():
-    session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    st.session_state.sessions[session_id] = {
-        "name": f"Study Session {len(st.session_state.sessions) + 1}",
-        "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
-        "learning_path": [],
-        "quiz_scores": [],
-        "topic_performance": {},
-        "pdf_content": [],
-        "pdf_full_text": "",
-        "chat_history": [],
-        "current_study_topic": None,
-        "study_conversation": [],
-        "topic_history": {},
-        "quiz_data": None,
-        "user_answers": {},
-        "recommended_topics": []
-    }
+    session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    session = empty_session(
+        f"Study Session {session_store.count_sessions(st.session_state.user_id) + 1}",
+        datetime.now().strftime("%Y-%m-%d %H:%M")
+    )
+    session_store.create_session(session_id, st.session_state.user_id, session)
+    st.session_state.sessions = {session_id: session}
     st.session_state.current_session_id = session_id
     return session_id
 
 def delete_session(session_id):
-    if session_id in st.session_state.sessions:
-        del st.session_state.sessions[session_id]
-        if st.session_state.current_session_id == session_id:
-            # Switch to another session or create new one
-            if st.session_state.sessions:
-                st.session_state.current_session_id = list(st.session_state.sessions.keys())[0]
-            else:
-                create_new_session()
+    session_store.delete_session(session_id)
+    st.session_state.sessions.pop(session_id, None)
+    document_store.collect_garbage(session_store.live_document_ids())
+    if st.session_state.current_session_id == session_id:
+        # Switch to another session or create new one
+        remaining = session_store.list_sessions(st.session_state.user_id)
+        if remaining:
+            st.session_state.current_session_id = remaining[0]["id"]
+        else:
+            create_new_session()
+
+def save_session(*fields):
+    session_store.save_fields(st.session_state.current_session_id, get_current_session(), fields)
+
+def save_topic(topic):
+    session = get_current_session()
+    if topic in session["topic_history"]:
+        session_store.save_topic(st.session_state.current_session_id, topic, session["topic_history"][topic])
+
+def record_quiz_attempt(attempt):
+    session = get_current_session()
+    session["quiz_scores"].append(attempt)
+    record_attempt(session["analytics"], attempt, len(session["quiz_scores"]) - 1)
+    session_store.add_quiz_attempt(st.session_state.current_session_id, attempt)
 
 init_session()
 
@@ -238,28 +271,27 @@ st.markdown("""
         border-radius: 6px;
     }
     
-    /* Tabs - Enhanced */
-    .stTabs [data-baseweb="tab-list"] {
+    /* View selector */
+    .st-key-active_view [role="radiogroup"] {
         background-color: #1a1a1a;
         padding: 0.5rem;
         border-radius: 8px;
         gap: 0.5rem;
     }
-    .stTabs [data-baseweb="tab"] {
+    .st-key-active_view label {
         color: #b8b8b8;
         padding: 0.8rem 1.5rem;
         font-weight: 500;
         border-radius: 6px;
         transition: all 0.3s;
     }
-    .stTabs [data-baseweb="tab"]:hover {
+    .st-key-active_view label:hover {
         background-color: #2a2a2a;
         color: #e8e8e8;
     }
-    .stTabs [aria-selected="true"] {
+    .st-key-active_view label:has(input:checked) {
         background-color: #8b0000 !important;
         color: #ffffff !important;
-        border-bottom: none !important;
     }
     
     /* File uploader */
@@ -312,8 +344,10 @@ with st.sidebar:
     st.markdown("")
     st.markdown("**Your Sessions:**")
     
-    if st.session_state.sessions:
-        for session_id, session_data in st.session_state.sessions.items():
+    user_sessions = session_store.list_sessions(st.session_state.user_id)
+    if user_sessions:
+        for session_data in user_sessions:
+            session_id = session_data["id"]
             is_active = session_id == st.session_state.current_session_id
             
             col1, col2 = st.columns([5, 1])
@@ -335,6 +369,10 @@ with st.sidebar:
                 st.caption(f"✅ Active | Created: {session_data['created']}")
             else:
                 st.caption(f"Created: {session_data['created']}")
+    
+    st.markdown("---")
+    cache_stats = llm_cache.stats()
+    st.caption(f"⚡ LLM cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})")
 
 # Get current session
 current_session = get_current_session()
@@ -354,94 +392,29 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "💬 Ask AI", 
-    "📚 Deep Study", 
-    "📝 Quiz & Assessment", 
-    "🎯 Learning Path", 
-    "📊 Analytics", 
-    "ℹ️ About"
-])
-
-with tab1:
-    st.header("PDF-Grounded AI Tutor")
-    
-    # PDF Upload
-    uploaded_file = st.file_uploader("📄 Upload PDF (Required for document-based Q&A)", type="pdf")
-    if uploaded_file:
-        with st.spinner("Processing PDF..."):
-            pages_content = extract_pdf_text(uploaded_file)
-            current_session["pdf_content"] = pages_content
-            current_session["pdf_full_text"] = " ".join([p["text"] for p in pages_content])
-            st.success(f"✅ PDF loaded ({len(pages_content)} pages, {len(current_session['pdf_full_text'])} characters)")
-    
-    # PDF Summary
-    if current_session["pdf_content"]:
-        if st.button("📋 Summarize PDF"):
-            with st.spinner("Generating summary..."):
-                prompt = f"""Summarize this biotechnology document. Include:
-1. Main topics covered
-2. Key concepts
-3. Document structure
-
-Document content:
-{current_session['pdf_full_text'][:8000]}
-
-Provide a clear, organized summary for study purposes."""
-                summary = call_llm(prompt)
-                st.markdown("### 📋 Document Summary")
-                st.markdown(summary)
-    
-    st.divider()
-    
+@st.fragment
+def render_document_chat():
+    # Typing and asking rerun only this part of the page
     question = st.text_input("Ask a question about the uploaded PDF:")
     
     if st.button("Get Answer") and question:
-        if not current_session["pdf_content"]:
+        if not current_session["pdf_doc_id"]:
             st.error("⚠️ Please upload a PDF first!")
         else:
-            with st.spinner("Searching document..."):
-                # Check if answer exists in PDF
-                check_prompt = f"""Based ONLY on this document content, can you answer this question: '{question}'?
-
-Document content:
-{current_session['pdf_full_text'][:8000]}
-
-Answer ONLY 'yes' if the information exists in the document, or 'no' if it doesn't."""
-                check_response = call_llm(check_prompt, "You are a document analyzer. Answer only 'yes' or 'no'.")
+            with llm_errors(), st.spinner("Searching document..."):
+                result = service.answer_from_document(current_session["pdf_doc_id"], question, current_session["pdf_pages"])
                 
-                if "no" in check_response.lower():
+                if not result["covered"]:
                     st.error("⚠️ This topic is not covered in the uploaded material. Please use the Personalized Learning module.")
                 else:
-                    # Answer from document
-                    answer_prompt = f"""Answer this question using ONLY information from the document below. Do not use external knowledge.
-
-Question: {question}
-
-Document content:
-{current_session['pdf_full_text']}
-
-Provide a clear, student-friendly explanation based strictly on the document content. If you reference specific information, mention it came from the document."""
-                    answer = call_llm(answer_prompt, "You are a tutor. Answer ONLY using the provided document. Do not add external information.")
-                    
+                    answer = result["answer"]
                     st.markdown("### 📖 Answer from Document")
                     st.markdown(answer)
                     st.info("ℹ️ This answer is based solely on your uploaded PDF document.")
-                    
-                    # Try to find page references
-                    page_prompt = f"""Which page(s) in the document contain information about: '{question}'?
-Analyze the content and list relevant page numbers.
-
-Document pages:
-{json.dumps([{"page": p["page"], "preview": p["text"][:200]} for p in current_session['pdf_content'][:10]])}
-
-Return only page numbers as a comma-separated list, or 'unknown' if unclear."""
-                    page_response = call_llm(page_prompt, "Extract page numbers only.")
-                    
-                    if "unknown" not in page_response.lower():
-                        st.caption(f"📄 Source: Page(s) {page_response}")
+                    st.caption(f"📄 Source: Page(s) {', '.join(str(p) for p in result['pages'])}")
                     
                     current_session["chat_history"].append({"q": question, "a": answer})
+                    session_store.add_conversation(st.session_state.current_session_id, "pdf", None, question, answer)
     
     # Chat history
     if current_session["chat_history"]:
@@ -451,7 +424,138 @@ Return only page numbers as a comma-separated list, or 'unknown' if unclear."""
             with st.expander(f"{i}. {chat['q'][:50]}..."):
                 st.write(chat['a'][:200] + "...")
 
-with tab2:
+def render_ask_view():
+    st.header("PDF-Grounded AI Tutor")
+    
+    # PDF Upload
+    uploaded_file = st.file_uploader("📄 Upload PDF (Required for document-based Q&A)", type="pdf")
+    if uploaded_file:
+        # Only ingest when a different upload is attached; reruns reuse the stored pages
+        # (or the earlier failure, so a broken file isn't parsed again on every rerun)
+        if uploaded_file.file_id not in (current_session.get("pdf_file_id"), st.session_state.get("unreadable_pdf_file_id")):
+            progress_bar = st.progress(0.0, text="Processing PDF...")
+            try:
+                doc_id, page_offsets = load_pdf(uploaded_file, progress_bar)
+            except UnreadablePdfError as exc:
+                st.session_state.unreadable_pdf_file_id = uploaded_file.file_id
+                st.session_state.unreadable_pdf_error = str(exc)
+            else:
+                replaced_doc_id = current_session["pdf_doc_id"]
+                current_session["pdf_doc_id"] = doc_id
+                current_session["pdf_pages"] = page_offsets
+                current_session["pdf_file_id"] = uploaded_file.file_id
+                save_session("pdf_doc_id", "pdf_pages", "pdf_file_id")
+                if replaced_doc_id and replaced_doc_id != doc_id:
+                    document_store.collect_garbage(session_store.live_document_ids())
+            finally:
+                progress_bar.empty()
+        if uploaded_file.file_id == st.session_state.get("unreadable_pdf_file_id"):
+            st.error(f"⚠️ {st.session_state.unreadable_pdf_error} Please upload another file.")
+        else:
+            st.success(f"✅ PDF loaded ({len(current_session['pdf_pages'])} pages, {document_store.meta(current_session['pdf_doc_id'])['chars']} characters)")
+    
+    # PDF Summary (nothing to summarize when no text could be extracted)
+    if current_session["pdf_doc_id"] and document_store.meta(current_session["pdf_doc_id"])["chars"]:
+        if st.button("📋 Summarize PDF"):
+            st.markdown("### 📋 Document Summary")
+            with llm_errors():
+                with st.status("Summarizing document sections...") as status:
+                    summary = service.summarize_document(
+                        current_session["pdf_doc_id"], stream=True, user_id=st.session_state.user_id,
+                        progress=lambda done, total: status.update(label=f"Summarized {done} of {total} sections...")
+                    )
+                    status.update(label="Sections summarized", state="complete")
+                st.write_stream(summary)
+    
+    st.divider()
+    
+    render_document_chat()
+
+@st.fragment
+def render_study_chat(topic):
+    # Asking a follow-up reruns only the conversation
+    st.subheader("💬 Ask Questions")
+    question = st.text_input("Ask anything about this topic:", key="study_question")
+    
+    if st.button("Ask", key="ask_study"):
+        if question:
+            with llm_errors():
+                answer = st.write_stream(service.answer_study_question(topic, question, current_session["study_conversation"], stream=True))
+                current_session["study_conversation"].append({"q": question, "a": answer})
+                
+                if topic in current_session["topic_history"]:
+                    current_session["topic_history"][topic]["conversations"] = current_session["study_conversation"]
+                session_store.add_conversation(st.session_state.current_session_id, "study", topic, question, answer)
+                
+                st.rerun(scope="fragment")
+    
+    if current_session["study_conversation"]:
+        st.divider()
+        st.subheader("📝 Previous Explanations")
+        for i, conv in enumerate(current_session["study_conversation"]):
+            with st.expander(f"Q{i+1}: {conv['q'][:50]}..."):
+                st.markdown(f"**Question:** {conv['q']}")
+                st.markdown(f"**Answer:** {conv['a']}")
+
+@st.fragment
+def render_study_quiz(topic, quiz_difficulty):
+    # Picking answers reruns only the quiz, not the transcript and explanation above it
+    if current_session["quiz_data"]:
+        st.divider()
+        questions = current_session["quiz_data"]["questions"]
+        
+        for i, q in enumerate(questions):
+            st.write(f"**Question {i+1}:** {q['question']}")
+            answer = st.radio(
+                "Select:",
+                options=q["options"],
+                key=f"study_q_{i}",
+                index=None
+            )
+            if answer:
+                current_session["user_answers"][i] = q["options"].index(answer)
+            st.write("")
+        
+        if st.button("Submit Quiz", key="submit_study_quiz"):
+            if len(current_session["user_answers"]) == len(questions):
+                scored = score_quiz(questions, current_session["user_answers"])
+                score, percentage = scored["score"], scored["percentage"]
+                
+                # Color coding
+                if percentage < 50:
+                    st.error(f"Score: {score}/{len(questions)} ({percentage:.0f}%) - Poor")
+                elif percentage < 70:
+                    st.warning(f"Score: {score}/{len(questions)} ({percentage:.0f}%) - Average")
+                else:
+                    st.success(f"Score: {score}/{len(questions)} ({percentage:.0f}%) - Good")
+                
+                st.subheader("Results")
+                for i, result in enumerate(scored["results"]):
+                    if result["correct"]:
+                        st.write(f"✅ Q{i+1}: Correct!")
+                    else:
+                        st.write(f"❌ Q{i+1}: Wrong. Correct: {result['answer']}")
+                    st.write(f"💡 {result['explanation']}")
+                    st.write("")
+                
+                current_session["topic_performance"][topic] = percentage
+                record_quiz_attempt({
+                    "topic": topic,
+                    "score": score,
+                    "total": len(questions),
+                    "difficulty": current_session["quiz_data"].get("difficulty", quiz_difficulty)
+                })
+                save_session("topic_performance", "user_answers")
+                
+                if st.button("Retake Quiz"):
+                    current_session["quiz_data"] = None
+                    current_session["user_answers"] = {}
+                    save_session("quiz_data", "user_answers")
+                    st.rerun()
+            else:
+                st.warning("Please answer all questions!")
+
+def render_study_view():
     st.header("📚 Deep Study Mode")
     
     # Topic selection
@@ -461,26 +565,18 @@ with tab2:
     with col2:
         if st.button("Start Studying"):
             if new_topic:
-                with st.spinner("Validating topic..."):
-                    validation_prompt = f"""Is '{new_topic}' a topic related to biotechnology?
-
-Biotechnology includes: molecular biology, genetics, cell biology, microbiology, bioengineering, biochemistry, genetic engineering, biomedical applications, agricultural biotechnology, industrial biotechnology.
-
-Answer ONLY 'yes' or 'no'."""
-                    validation_response = call_llm(validation_prompt, "You are a biotechnology topic classifier. Answer only 'yes' or 'no'.")
-                    
-                    if "no" in validation_response.lower():
+                with llm_errors(), st.spinner("Validating topic..."):
+                    if not service.is_biotech_related(new_topic):
                         st.error("⚠️ This topic is not related to biotechnology. Please enter a biotechnology topic.")
                     else:
                         current_session["current_study_topic"] = new_topic
-                        current_session["study_conversation"] = []
                         
                         if new_topic not in current_session["topic_history"]:
-                            current_session["topic_history"][new_topic] = {
-                                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                                "conversations": [],
-                                "quizzes": []
-                            }
+                            current_session["topic_history"][new_topic] = new_topic_entry()
+                            save_topic(new_topic)
+                        # Returning to a topic resumes its stored conversation
+                        current_session["study_conversation"] = current_session["topic_history"][new_topic]["conversations"]
+                        save_session("current_study_topic")
                         st.rerun()
     
     # Current topic display
@@ -506,38 +602,39 @@ Answer ONLY 'yes' or 'no'."""
                 else:
                     st.metric("Performance", "No quiz taken")
             with col3:
-                quiz_count = len([q for q in current_session["quiz_scores"] if q["topic"] == topic])
-                st.metric("Quizzes Taken", quiz_count)
+                topic_stats = current_session["analytics"]["topics"].get(topic)
+                st.metric("Quizzes Taken", topic_stats["attempts"] if topic_stats else 0)
         
         st.divider()
         
         # Detailed explanation
         st.subheader("📖 Topic Overview")
         if st.button("Generate Detailed Explanation", key="gen_explanation"):
-            with st.spinner("Generating comprehensive explanation..."):
-                # Double-check topic is biotech-related
-                validation_prompt = f"""Is '{topic}' a topic related to biotechnology? Answer ONLY 'yes' or 'no'."""
-                validation_response = call_llm(validation_prompt, "You are a biotechnology topic classifier. Answer only 'yes' or 'no'.")
-                
-                if "no" in validation_response.lower():
+            topic_ok = False
+            with llm_errors(), st.spinner("Validating topic..."):
+                # Double-check topic is biotech-related (remembered from Start Studying, so usually instant)
+                topic_ok = service.is_biotech_related(topic)
+                if not topic_ok:
                     st.error("⚠️ This topic is not related to biotechnology. Please enter a biotechnology topic.")
-                else:
-                    explain_prompt = f"""Provide a comprehensive, detailed explanation of '{topic}' STRICTLY from a biotechnology perspective.
-
-Include:
-1. **Introduction**: What is {topic}? (2-3 paragraphs)
-2. **Key Concepts**: Main principles and mechanisms (4-5 points with details)
-3. **Biological Significance**: Why is this important in biotechnology?
-4. **Real-World Applications**: Practical uses and examples in biotechnology (3-4 applications)
-5. **Current Research**: Recent developments or future directions in biotechnology
-6. **Common Misconceptions**: What students often get wrong
-
-IMPORTANT: Focus ONLY on biotechnology aspects. Do not drift into unrelated subjects. Make it detailed, student-friendly, and comprehensive for deep learning."""
-                    explanation = call_llm(explain_prompt, "You are a biotechnology expert. Explain ONLY biotechnology-related aspects.")
-                    st.markdown(explanation)
+            
+            if topic_ok:
+                topic_data = current_session["topic_history"].get(topic)
+                resources_future = None
+                if topic_data is not None and topic_data.get("resources") is None:
+                    # Resources don't depend on the explanation, so fetch them while it streams. Only if a
+                    # slot is free right now: they can still be loaded on demand below.
+                    resources_future = llm_executor.try_submit(st.session_state.user_id, service.fetch_learning_resources, topic)
+                
+                with llm_errors():
+                    explanation = st.write_stream(service.explain_topic(topic, stream=True))
                     
-                    if topic in current_session["topic_history"]:
-                        current_session["topic_history"][topic]["explanation"] = explanation
+                    if topic_data is not None:
+                        topic_data["explanation"] = explanation
+                    if resources_future is not None:
+                        resources = llm_executor.gather({"resources": resources_future})["resources"]
+                        if isinstance(resources, list):
+                            topic_data["resources"] = resources
+                    save_topic(topic)
         
         if topic in current_session["topic_history"] and "explanation" in current_session["topic_history"][topic]:
             with st.expander("📚 View Saved Explanation", expanded=True):
@@ -545,67 +642,41 @@ IMPORTANT: Focus ONLY on biotechnology aspects. Do not drift into unrelated subj
         
         st.divider()
         
-        # Learning resources
+        # Learning resources (fetched on demand and kept with the topic)
         with st.expander("🔗 Additional Learning Resources", expanded=False):
-            with st.spinner("Fetching resources..."):
-                resource_prompt = f"""For the biotechnology topic '{topic}', suggest 5 high-quality learning resources.
-Return ONLY valid JSON:
-{{
-  "resources": [
-    {{"title": "Resource name", "url": "https://example.com", "description": "Brief description", "type": "Website/Video/Article"}}
-  ]
-}}
-Use reputable sources: Khan Academy, Nature Education, NCBI, MIT OCW, university websites, YouTube lectures."""
-                resource_response = call_llm(resource_prompt)
-                
-                try:
-                    start = resource_response.find('{')
-                    end = resource_response.rfind('}') + 1
-                    resource_json = resource_response[start:end]
-                    resources = json.loads(resource_json)["resources"]
-                    
-                    for res in resources:
-                        st.markdown(f"**[{res['title']}]({res['url']})** ({res.get('type', 'Resource')})")
-                        st.write(res['description'])
-                        st.write("")
-                except:
-                    st.write("Could not load resources. Try again.")
-        
-        # Interactive Q&A
-        st.subheader("💬 Ask Questions")
-        question = st.text_input("Ask anything about this topic:", key="study_question")
-        
-        if st.button("Ask", key="ask_study"):
-            if question:
-                with st.spinner("Thinking..."):
-                    context = "\n".join([f"Q: {c['q']}\nA: {c['a']}" for c in current_session["study_conversation"][-3:]])
-                    prompt = f"""You are teaching about '{topic}' in biotechnology.
-
-Previous conversation:
-{context}
-
-Student question: {question}
-
-Provide a clear, student-friendly answer focused STRICTLY on biotechnology aspects. Assume the question is about the current topic unless specified otherwise. Do not provide general-purpose answers unrelated to biotechnology."""
-                    answer = call_llm(prompt, "You are a biotechnology tutor. Answer ONLY biotechnology-related questions.")
-                    current_session["study_conversation"].append({"q": question, "a": answer})
-                    
-                    if topic in current_session["topic_history"]:
-                        current_session["topic_history"][topic]["conversations"] = current_session["study_conversation"]
-                    
-                    st.rerun()
+            topic_data = current_session["topic_history"].setdefault(topic, new_topic_entry())
+            resources = topic_data.get("resources")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                load_clicked = st.button("Load Resources", key="load_resources", disabled=resources is not None)
+            with col2:
+                refresh_clicked = st.button("🔄 Refresh", key="refresh_resources", disabled=resources is None)
+            
+            if load_clicked or refresh_clicked:
+                with llm_errors():
+                    with st.spinner("Fetching resources..."):
+                        fetched = service.fetch_learning_resources(topic, refresh=refresh_clicked)
+                    if fetched is None:
+                        st.write("Could not load resources. Try again.")
+                    else:
+                        topic_data["resources"] = fetched
+                        save_topic(topic)
+                        resources = fetched
+            
+            if resources:
+                for res in resources:
+                    st.markdown(f"**[{res['title']}]({res['url']})** ({res.get('type', 'Resource')})")
+                    st.write(res.get('description', ''))
+                    st.write("")
+            elif resources is None and not (load_clicked or refresh_clicked):
+                st.caption("Click 'Load Resources' to get suggested materials for this topic.")
         
-        if current_session["study_conversation"]:
-            st.divider()
-            st.subheader("📝 Previous Explanations")
-            for i, conv in enumerate(current_session["study_conversation"]):
-                with st.expander(f"Q{i+1}: {conv['q'][:50]}..."):
-                    st.markdown(f"**Question:** {conv['q']}")
-                    st.markdown(f"**Answer:** {conv['a']}")
+        render_study_chat(topic)
         
         st.divider()
         
-        past_quizzes = [q for q in current_session["quiz_scores"] if q["topic"] == topic]
+        past_quizzes = topic_attempts(current_session["analytics"], current_session["quiz_scores"], topic)
         if past_quizzes:
             st.subheader("📊 Past Quiz Results")
             for i, quiz in enumerate(past_quizzes, 1):
@@ -627,201 +698,25 @@ Provide a clear, student-friendly answer focused STRICTLY on biotechnology aspec
             num_questions = st.selectbox("Number of Questions:", [3, 5, 7], index=1)
         
         if st.button("Generate Quiz", key="gen_study_quiz"):
-            with st.spinner("Creating quiz..."):
-                if quiz_difficulty == "Easy":
-                    instructions = "Focus on basic definitions, simple facts, and foundational concepts."
-                elif quiz_difficulty == "Intermediate":
-                    instructions = "Focus on conceptual understanding, mechanisms, and applications."
-                else:
-                    instructions = "Focus on advanced concepts, analytical scenarios, and higher-order thinking."
-                
-                prompt = f"""Generate a {quiz_difficulty} difficulty quiz on '{topic}' with {num_questions} multiple-choice questions.
-{instructions}
-
-Return ONLY valid JSON:
-{{
-  "questions": [
-    {{
-      "question": "Question text?",
-      "options": ["Option A", "Option B", "Option C", "Option D"],
-      "correct": 0,
-      "explanation": "Brief explanation"
-    }}
-  ]
-}}
-
-Make sure questions are DIFFERENT from other difficulty levels and appropriate for {quiz_difficulty} level."""
-                response = call_llm(prompt)
-                quiz_generated = False
-                try:
-                    start = response.find('{')
-                    end = response.rfind('}') + 1
-                    quiz_json = response[start:end]
-                    current_session["quiz_data"] = json.loads(quiz_json)
+            with llm_errors():
+                questions = serve_quiz(topic, quiz_difficulty, "mcq", num_questions)
+                if questions:
+                    current_session["quiz_data"] = {"questions": questions, "topic": topic, "difficulty": quiz_difficulty}
                     current_session["user_answers"] = {}
-                    quiz_generated = True
-                except:
-                    pass
-                
-                if quiz_generated:
+                    save_session("quiz_data", "user_answers")
                     st.rerun()
                 else:
                     st.error("Failed to generate quiz. Try again.")
         
-        if current_session["quiz_data"]:
-            st.divider()
-            questions = current_session["quiz_data"]["questions"]
-            
-            for i, q in enumerate(questions):
-                st.write(f"**Question {i+1}:** {q['question']}")
-                answer = st.radio(
-                    "Select:",
-                    options=q["options"],
-                    key=f"study_q_{i}",
-                    index=None
-                )
-                if answer:
-                    current_session["user_answers"][i] = q["options"].index(answer)
-                st.write("")
-            
-            if st.button("Submit Quiz", key="submit_study_quiz"):
-                if len(current_session["user_answers"]) == len(questions):
-                    score = sum(1 for i, ans in current_session["user_answers"].items() if ans == questions[i]["correct"])
-                    percentage = (score / len(questions)) * 100
-                    
-                    # Color coding
-                    if percentage < 50:
-                        st.error(f"Score: {score}/{len(questions)} ({percentage:.0f}%) - Poor")
-                    elif percentage < 70:
-                        st.warning(f"Score: {score}/{len(questions)} ({percentage:.0f}%) - Average")
-                    else:
-                        st.success(f"Score: {score}/{len(questions)} ({percentage:.0f}%) - Good")
-                    
-                    st.subheader("Results")
-                    for i, q in enumerate(questions):
-                        user_ans = current_session["user_answers"].get(i)
-                        correct = q["correct"]
-                        if user_ans == correct:
-                            st.write(f"✅ Q{i+1}: Correct!")
-                        else:
-                            st.write(f"❌ Q{i+1}: Wrong. Correct: {q['options'][correct]}")
-                        st.write(f"💡 {q['explanation']}")
-                        st.write("")
-                    
-                    current_session["topic_performance"][topic] = percentage
-                    current_session["quiz_scores"].append({
-                        "topic": topic,
-                        "score": score,
-                        "total": len(questions),
-                        "difficulty": quiz_difficulty
-                    })
-                    
-                    if st.button("Retake Quiz"):
-                        current_session["quiz_data"] = None
-                        current_session["user_answers"] = {}
-                        st.rerun()
-                else:
-                    st.warning("Please answer all questions!")
+        # Keep this topic's bank topped up in the background for the next quiz
+        service.schedule_quiz_refill(topic, quiz_difficulty, "mcq")
+        
+        render_study_quiz(topic, quiz_difficulty)
     else:
         st.info("👆 Enter a topic above to start your deep study session!")
 
-with tab3:
-    st.header("Quiz & Assessment")
-    
-    quiz_topic = st.text_input("Topic for quiz:", key="quiz_topic")
-    col1, col2 = st.columns(2)
-    with col1:
-        difficulty = st.radio("Difficulty:", ["Easy", "Medium", "Hard"], horizontal=True)
-    with col2:
-        quiz_type = st.selectbox("Quiz Type:", ["Multiple Choice", "True/False", "Fill in the Blank", "Mixed"])
-    
-    if st.button("Generate Quiz"):
-        if quiz_topic:
-            with st.spinner("Creating quiz..."):
-                if quiz_type == "Multiple Choice":
-                    prompt = f"""Generate a {difficulty} quiz on '{quiz_topic}' with 5 multiple-choice questions.
-Return ONLY valid JSON:
-{{
-  "questions": [
-    {{
-      "type": "mcq",
-      "question": "Question text?",
-      "options": ["Option A", "Option B", "Option C", "Option D"],
-      "correct": 0,
-      "explanation": "Brief explanation"
-    }}
-  ]
-}}"""
-                elif quiz_type == "True/False":
-                    prompt = f"""Generate a {difficulty} quiz on '{quiz_topic}' with 5 true/false questions.
-Return ONLY valid JSON:
-{{
-  "questions": [
-    {{
-      "type": "tf",
-      "question": "Statement here",
-      "correct": "True",
-      "explanation": "Brief explanation"
-    }}
-  ]
-}}"""
-                elif quiz_type == "Fill in the Blank":
-                    prompt = f"""Generate a {difficulty} quiz on '{quiz_topic}' with 5 fill-in-the-blank questions.
-Return ONLY valid JSON:
-{{
-  "questions": [
-    {{
-      "type": "fill",
-      "question": "Question with _____ blank",
-      "correct": "answer",
-      "explanation": "Brief explanation"
-    }}
-  ]
-}}"""
-                else:  # Mixed
-                    prompt = f"""Generate a {difficulty} mixed quiz on '{quiz_topic}' with 5 questions (mix of MCQ, True/False, Fill-in-blank).
-Return ONLY valid JSON:
-{{
-  "questions": [
-    {{
-      "type": "mcq",
-      "question": "Question?",
-      "options": ["A", "B", "C", "D"],
-      "correct": 0,
-      "explanation": "Explanation"
-    }},
-    {{
-      "type": "tf",
-      "question": "Statement",
-      "correct": "True",
-      "explanation": "Explanation"
-    }},
-    {{
-      "type": "fill",
-      "question": "Question with _____",
-      "correct": "answer",
-      "explanation": "Explanation"
-    }}
-  ]
-}}"""
-                
-                response = call_llm(prompt)
-                quiz_generated = False
-                try:
-                    start = response.find('{')
-                    end = response.rfind('}') + 1
-                    quiz_json = response[start:end]
-                    current_session["quiz_data"] = json.loads(quiz_json)
-                    current_session["user_answers"] = {}
-                    quiz_generated = True
-                except:
-                    pass
-                
-                if quiz_generated:
-                    st.rerun()
-                else:
-                    st.error("Failed to generate quiz. Try again.")
-    
+@st.fragment
+def render_quiz_answers(quiz_topic, difficulty):
     if current_session["quiz_data"]:
         st.divider()
         questions = current_session["quiz_data"]["questions"]
@@ -861,58 +756,119 @@ Return ONLY valid JSON:
         
         if st.button("Submit Quiz"):
             if len(current_session["user_answers"]) == len(questions):
-                score = 0
-                for i, q in enumerate(questions):
-                    user_ans = current_session["user_answers"].get(i)
-                    q_type = q.get("type", "mcq")
-                    
-                    if q_type == "mcq":
-                        if user_ans == q["correct"]:
-                            score += 1
-                    elif q_type == "tf":
-                        if user_ans == q["correct"]:
-                            score += 1
-                    elif q_type == "fill":
-                        if user_ans == q["correct"].lower():
-                            score += 1
-                
+                scored = score_quiz(questions, current_session["user_answers"])
+                score = scored["score"]
                 st.success(f"Score: {score}/{len(questions)}")
                 
                 st.subheader("Results")
-                for i, q in enumerate(questions):
-                    user_ans = current_session["user_answers"].get(i)
-                    q_type = q.get("type", "mcq")
-                    
-                    if q_type == "mcq":
-                        correct = q["correct"]
-                        if user_ans == correct:
-                            st.write(f"✅ Q{i+1}: Correct!")
-                        else:
-                            st.write(f"❌ Q{i+1}: Wrong. Correct answer: {q['options'][correct]}")
-                    elif q_type == "tf":
-                        if user_ans == q["correct"]:
-                            st.write(f"✅ Q{i+1}: Correct!")
-                        else:
-                            st.write(f"❌ Q{i+1}: Wrong. Correct answer: {q['correct']}")
-                    elif q_type == "fill":
-                        if user_ans == q["correct"].lower():
-                            st.write(f"✅ Q{i+1}: Correct!")
-                        else:
-                            st.write(f"❌ Q{i+1}: Wrong. Correct answer: {q['correct']}")
+                for i, result in enumerate(scored["results"]):
+                    if result["correct"]:
+                        st.write(f"✅ Q{i+1}: Correct!")
+                    else:
+                        st.write(f"❌ Q{i+1}: Wrong. Correct answer: {result['answer']}")
                     
-                    st.write(f"💡 {q['explanation']}")
+                    st.write(f"💡 {result['explanation']}")
                     st.divider()
                 
-                current_session["quiz_scores"].append({"topic": quiz_topic, "score": score, "total": len(questions)})
+                # Quizzes saved before quiz_data kept its settings fall back to the widgets
+                quiz_topic = current_session["quiz_data"].get("topic", quiz_topic)
+                record_quiz_attempt({
+                    "topic": quiz_topic,
+                    "score": score,
+                    "total": len(questions),
+                    "difficulty": current_session["quiz_data"].get("difficulty", difficulty)
+                })
                 
-                percentage = (score / len(questions)) * 100
-                current_session["topic_performance"][quiz_topic] = percentage
+                current_session["topic_performance"][quiz_topic] = scored["percentage"]
                 
                 current_session["quiz_data"] = None
+                save_session("topic_performance", "quiz_data")
             else:
                 st.warning("Please answer all questions!")
 
-with tab4:
+def render_quiz_view():
+    st.header("Quiz & Assessment")
+    
+    quiz_topic = st.text_input("Topic for quiz:", key="quiz_topic")
+    col1, col2 = st.columns(2)
+    with col1:
+        difficulty = st.radio("Difficulty:", ["Easy", "Medium", "Hard"], horizontal=True, key="quiz_difficulty")
+    with col2:
+        quiz_type = st.selectbox("Quiz Type:", ["Multiple Choice", "True/False", "Fill in the Blank", "Mixed"], key="quiz_type")
+    
+    if st.button("Generate Quiz"):
+        if quiz_topic:
+            with llm_errors():
+                questions = serve_quiz(quiz_topic, difficulty, QUIZ_TYPES[quiz_type], 5)
+                if questions:
+                    # The attempt is recorded with the settings the quiz was made with, not the widgets' current ones
+                    current_session["quiz_data"] = {"questions": questions, "topic": quiz_topic, "difficulty": difficulty}
+                    current_session["user_answers"] = {}
+                    save_session("quiz_data", "user_answers")
+                    st.rerun()
+                else:
+                    st.error("Failed to generate quiz. Try again.")
+    
+    render_quiz_answers(quiz_topic, difficulty)
+
+    st.divider()
+    
+    # Batch generation for instructors preparing practice sets across many topics
+    with st.expander("📦 Batch Quiz Generation", expanded=False):
+        st.caption("Add one row per topic. Questions go into the shared quiz bank and can be exported as JSON.")
+        batch_rows = st.data_editor(
+            [{"Topic": "", "Difficulty": "Medium", "Type": "Multiple Choice", "Count": 5}],
+            num_rows="dynamic",
+            use_container_width=True,
+            key="batch_specs",
+            column_config={
+                "Topic": st.column_config.TextColumn("Topic", required=True),
+                "Difficulty": st.column_config.SelectboxColumn("Difficulty", options=["Easy", "Medium", "Hard"], required=True),
+                "Type": st.column_config.SelectboxColumn("Type", options=list(QUIZ_TYPES), required=True),
+                "Count": st.column_config.NumberColumn("Count", min_value=1, max_value=50, step=1, required=True)
+            }
+        )
+        
+        if st.button("Run Batch", key="run_batch"):
+            specs = [
+                {"topic": row["Topic"], "difficulty": row["Difficulty"], "type": QUIZ_TYPES.get(row["Type"], "mcq"), "count": row["Count"]}
+                for row in batch_rows if row.get("Topic")
+            ]
+            if not specs:
+                st.warning("Add at least one topic.")
+            else:
+                progress_bar = st.progress(0.0, text="Starting batch...")
+                log = st.container()
+                
+                def report_batch_progress(result, questions, done, total):
+                    progress_bar.progress(done / total, text=f"Completed {done} of {total} requests")
+                    log.write(f"{'✅' if questions else '⚠️'} {result['topic']} ({result['difficulty']}, {result['type']}): +{len(questions)} questions")
+                
+                st.session_state.batch_results = run_quiz_batch(
+                    specs,
+                    service.generate_quiz_questions,
+                    llm_executor,
+                    st.session_state.user_id,
+                    bank=quiz_bank,
+                    on_result=report_batch_progress
+                )
+                progress_bar.empty()
+        
+        if st.session_state.get("batch_results"):
+            results = st.session_state.batch_results
+            generated = sum(len(r["questions"]) for r in results)
+            requested = sum(r["count"] for r in results)
+            st.success(f"Generated {generated} of {requested} questions across {len(results)} sets.")
+            if generated < requested:
+                st.warning("⚠️ Some requests failed or timed out. The questions generated so far are saved in the quiz bank; run the batch again for the rest.")
+            st.download_button(
+                "⬇️ Export as JSON",
+                data=export_batch(results),
+                file_name=f"quiz_batch_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
+                mime="application/json"
+            )
+
+def render_learning_path_view():
     st.header("Personalized Learning Path")
     
     studied_topics = list(current_session["topic_history"].keys())
@@ -934,28 +890,25 @@ with tab4:
         st.divider()
         
         if st.button("🔄 Get Suggested Next Topics"):
-            with st.spinner("Analyzing learning path..."):
-                topics_list = ", ".join(studied_topics)
-                prompt = f"""Based on these biotechnology topics studied in order: {topics_list}
-
-Suggest 3-5 logically connected next topics based on prerequisite relationships and natural progression.
-
-Return as a simple numbered list (e.g., 1. Topic Name).
-
-Ensure suggestions are:
-- Directly related to studied topics
-- Follow logical prerequisites
-- Progress in complexity
-- Avoid generic unrelated topics"""
-                suggestions = call_llm(prompt, "You are a biotechnology curriculum expert.")
-                
+            with llm_errors(), st.spinner("Analyzing learning path..."):
                 st.subheader("🎯 Suggested next topics:")
-                st.markdown(suggestions)
+                st.write_stream(service.suggest_topics(studied_topics, stream=True))
     else:
         st.info("⚠️ No learning data available for this session. Start studying topics in the Deep Study tab to build your personalized learning path.")
 
-with tab5:
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_analytics_figures(session_id, version, _quiz_scores, _analytics):
+    # Keyed by the session's attempt count, so figures are rebuilt only after a new quiz is recorded
+    percentages = [(q["score"] / q["total"]) * 100 if q["total"] else 0 for q in _quiz_scores]
+    return (
+        score_history_figure(percentages, [q["topic"] for q in _quiz_scores]),
+        topic_mastery_figure(_analytics["topics"]),
+        difficulty_figure(_analytics["difficulties"]) if _analytics["difficulties"] else None
+    )
+
+def render_analytics_view():
     st.header("Feedback Analytics Dashboard")
+    analytics = current_session["analytics"]
     
     col1, col2, col3 = st.columns(3)
     
@@ -963,43 +916,143 @@ with tab5:
         st.metric("Modules Completed", len(current_session["learning_path"]))
     
     with col2:
-        st.metric("Quizzes Taken", len(current_session["quiz_scores"]))
+        st.metric("Quizzes Taken", analytics["attempts"])
     
     with col3:
-        if current_session["quiz_scores"]:
-            total_questions = sum(q["total"] for q in current_session["quiz_scores"])
-            total_correct = sum(q["score"] for q in current_session["quiz_scores"])
-            avg_percentage = (total_correct / total_questions * 100) if total_questions > 0 else 0
+        avg_percentage = average_score(analytics)
+        if avg_percentage is not None:
             st.metric("Average Score", f"{avg_percentage:.0f}%")
         else:
             st.metric("Average Score", "N/A")
     
-    if current_session["quiz_scores"]:
+    if analytics["attempts"]:
         st.subheader("Quiz Performance")
-        for q in current_session["quiz_scores"]:
-            percentage = (q["score"] / q["total"]) * 100
-            st.write(f"**{q['topic']}**: {q['score']}/{q['total']} ({percentage:.0f}%)")
+        history_fig, mastery_fig, difficulty_fig = build_analytics_figures(
+            st.session_state.current_session_id, analytics["attempts"], current_session["quiz_scores"], analytics
+        )
+        st.plotly_chart(history_fig, use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(mastery_fig, use_container_width=True)
+        with col2:
+            if difficulty_fig is not None:
+                st.plotly_chart(difficulty_fig, use_container_width=True)
     
     st.divider()
     
     if st.button("Get Personalized Feedback"):
         if current_session["learning_path"] or current_session["quiz_scores"]:
-            with st.spinner("Analyzing your performance..."):
-                data = f"""Learning path: {current_session['learning_path']}
-Quiz scores: {current_session['quiz_scores']}"""
-                prompt = f"""Analyze this student's biotechnology learning data:
-{data}
-
-Provide:
-1. Strengths (2-3 points)
-2. Areas for improvement (2-3 points)
-3. Specific recommendations (3 actionable tips)"""
-                feedback = call_llm(prompt)
-                st.markdown(feedback)
+            with llm_errors(), st.spinner("Analyzing your performance..."):
+                st.write_stream(service.feedback(current_session["learning_path"], current_session["quiz_scores"], stream=True))
         else:
             st.warning("Complete some modules and quizzes first!")
 
-with tab6:
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_cohort_figures(version):
+    matrix = service.cohort_analytics.difficulty_matrix()
+    return (
+        difficulty_heatmap_figure(matrix) if len(matrix) else None,
+        score_distribution_figure(service.cohort_analytics.score_histogram())
+    )
+
+@st.fragment(run_every="30s")
+def render_cohort_view():
+    # Polls for new attempts; each refresh only aggregates rows added since the previous one
+    st.header("Cohort Analytics")
+    st.caption("Quiz results across every stored session and learner.")
+    cohort = service.cohort_analytics
+    version = cohort.refresh()
+    summary = cohort.summary()
+    if not summary["attempts"]:
+        st.info("No quiz attempts recorded yet.")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Quiz Attempts", f"{summary['attempts']:,}")
+    with col2:
+        st.metric("Learners", summary["users"])
+    with col3:
+        st.metric("Topics", summary["topics"])
+    with col4:
+        st.metric("Average Score", f"{summary['average_score']:.0f}%")
+    
+    heatmap_fig, distribution_fig = build_cohort_figures(version)
+    if heatmap_fig is not None:
+        st.plotly_chart(heatmap_fig, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Weakest Topics")
+        weakest = cohort.weakest_topics()
+        if len(weakest):
+            st.dataframe(
+                weakest.rename(columns={"attempts": "Attempts", "mean": "Mean %", "studied_in": "Sessions Studying"}),
+                column_config={"Mean %": st.column_config.NumberColumn(format="%.0f")},
+                use_container_width=True
+            )
+        else:
+            st.caption("No topic has enough attempts yet.")
+    with col2:
+        st.plotly_chart(distribution_fig, use_container_width=True)
+
+LLM_USAGE_SORT = {
+    "Total time": "total_seconds",
+    "Cost": "cost_usd",
+    "Prompt tokens": "prompt_tokens",
+    "Mean latency": "mean_latency",
+    "Calls": "calls"
+}
+
+def render_llm_usage_view():
+    # Admin panel: which call sites dominate LLM spend and latency in this process
+    st.header("LLM Usage")
+    st.caption("Every LLM call made by this server process since it started, grouped by call site and model.")
+    rows = service.metrics.summary()
+    if not rows:
+        st.info("No LLM calls recorded yet.")
+        return
+    
+    calls = sum(r["calls"] for r in rows)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("LLM Calls", f"{calls:,}")
+    with col2:
+        st.metric("Cache Hit Rate", f"{sum(r['cache_hits'] for r in rows) / calls:.0%}")
+    with col3:
+        st.metric("Tokens", f"{sum(r['prompt_tokens'] + r['completion_tokens'] for r in rows):,}")
+    with col4:
+        st.metric("Estimated Cost", f"${sum(r['cost_usd'] for r in rows):.4f}")
+    
+    sort_label = st.selectbox("Top offenders by", list(LLM_USAGE_SORT), key="llm_usage_sort")
+    st.dataframe(
+        service.metrics.top_sites(LLM_USAGE_SORT[sort_label], limit=len(rows)),
+        column_config={
+            "cost_usd": st.column_config.NumberColumn("Cost ($)", format="%.4f"),
+            "total_seconds": st.column_config.NumberColumn("Total (s)", format="%.1f"),
+            "mean_latency": st.column_config.NumberColumn("Mean latency (s)", format="%.2f"),
+            "mean_ttft": st.column_config.NumberColumn("Mean TTFT (s)", format="%.2f"),
+            "mean_queue": st.column_config.NumberColumn("Mean queue (s)", format="%.2f")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    st.subheader("Slowest Recent Calls")
+    slowest = sorted(service.metrics.recent_calls(), key=lambda c: c["latency"], reverse=True)[:10]
+    st.dataframe(
+        [{**c, "started": datetime.fromtimestamp(c["started"]).strftime("%H:%M:%S")} for c in slowest],
+        hide_index=True,
+        use_container_width=True
+    )
+    trims = service.metrics.trims()
+    if trims:
+        st.subheader("Trimmed Prompt Sections")
+        st.caption("Prompt sections cut to fit their token budgets (see prompt_budget.PROMPT_BUDGETS).")
+        st.dataframe(trims, hide_index=True, use_container_width=True)
+    st.download_button("Download Prometheus metrics", service.metrics.prometheus_text(), file_name="llm_metrics.prom", mime="text/plain")
+
+def render_about_view():
     st.header("About This Platform")
     st.markdown("""
     ### Features:
@@ -1017,3 +1070,35 @@ with tab6:
     - Retake quizzes for improvement
     - High-quality learning resources
     """)
+
+def is_instructor():
+    # Instructors open the app with ?admin=<ADMIN_TOKEN>; without ADMIN_TOKEN set nobody is one
+    token = os.getenv("ADMIN_TOKEN")
+    return bool(token) and hmac.compare_digest(st.query_params.get("admin", ""), token)
+
+# Only the selected view runs on a rerun; st.tabs would execute all of them every time
+VIEWS = {
+    "💬 Ask AI": render_ask_view,
+    "📚 Deep Study": render_study_view,
+    "📝 Quiz & Assessment": render_quiz_view,
+    "🎯 Learning Path": render_learning_path_view,
+    "📊 Analytics": render_analytics_view
+}
+# Views with data from every student's sessions, and LLM spend
+INSTRUCTOR_VIEWS = {
+    "🏫 Cohort": render_cohort_view,
+    "🛠️ LLM Usage": render_llm_usage_view
+}
+if is_instructor():
+    VIEWS.update(INSTRUCTOR_VIEWS)
+VIEWS["ℹ️ About"] = render_about_view
+
+# Widget values are dropped while their view isn't rendered; keep the ones quiz submission reads
+for key in ("quiz_topic", "quiz_difficulty", "quiz_type", "study_quiz_diff"):
+    if key in st.session_state:
+        st.session_state[key] = st.session_state[key]
+
+if st.session_state.get("active_view") not in VIEWS:
+    st.session_state.pop("active_view", None)
+active_view = st.radio("View", list(VIEWS), horizontal=True, key="active_view", label_visibility="collapsed")
+VIEWS[active_view]()
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic_pdf import make_pdf
+from llm_replay import REPLAY_CALLS, ReplayLLMClient, load_recordings
+from topic_classifier import TopicValidator
+from tutor_service import create_service, score_quiz
+
+# Run from the repository root: python -m benchmarks.bench_flows
+# Drives the tutor flows end to end against a local replay backend (no Groq calls) and
+# compares the results with benchmarks/baseline.json.
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+QUESTIONS = [
+    "What does Cas9 do?",
+    "How does PCR amplify DNA?",
+    "How is recombinant insulin produced?",
+    "What are hybridomas used for?",
+    "Why do plasmids carry resistance markers?",
+]
+TOPICS = ["CRISPR-Cas9", "Polymerase chain reaction", "Monoclonal antibodies", "Plasmid vectors", "Bioreactors"]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def build_flows(service, pdf_pages):
+    pdf = make_pdf(pdf_pages)
+    state = {}
+
+    def ingest(i):
+        # A fresh copy each time so the document store can't short-circuit the work
+        service.document_store.collect_garbage(set(), grace_seconds=-1)
+        state["doc_id"], _offsets, _failed = service.ingest_document(pdf)
+
+    def ask(i):
+        service.answer_from_document(state["doc_id"], QUESTIONS[i % len(QUESTIONS)])
+
+    def summarize(i):
+        "".join(service.summarize_document(state["doc_id"], stream=True))
+
+    def explain(i):
+        topic = TOPICS[i % len(TOPICS)]
+        service.is_biotech_related(topic)
+        "".join(service.explain_topic(topic, stream=True))
+        service.fetch_learning_resources(topic)
+
+    def quiz(i):
+        questions = service.create_quiz("bench", TOPICS[i % len(TOPICS)], "Intermediate", "mcq", 5)
+        score_quiz(questions, {q: 0 for q in range(len(questions))})
+
+    def suggestions(i):
+        "".join(service.suggest_topics(TOPICS[:3], stream=True))
+
+    return [
+        ("pdf_ingest", ingest),
+        ("get_answer", ask),
+        ("summarize_pdf", summarize),
+        ("explanation", explain),
+        ("quiz_generate_score", quiz),
+        ("suggestions", suggestions),
+    ]
+
+
+def run_flow(service, client, fn, iterations):
+    latencies, calls, prompt_tokens, completion_tokens = [], [], [], []
+    for i in range(iterations):
+        # Cold caches: every iteration pays for its LLM calls
+        service.llm_cache.clear()
+        service.topic_validator = TopicValidator()
+        client.reset()
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+        made = client.reset()
+        calls.append(len(made))
+        prompt_tokens.append(sum(c["prompt_tokens"] for c in made))
+        completion_tokens.append(sum(c["completion_tokens"] for c in made))
+
+    # Memory is measured in a separate pass so tracing doesn't distort the timings
+    service.llm_cache.clear()
+    tracemalloc.start()
+    fn(iterations)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    client.reset()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "calls": statistics.mean(calls),
+        "prompt_tokens": statistics.mean(prompt_tokens),
+        "completion_tokens": statistics.mean(completion_tokens),
+        "peak_mb": peak / 1e6,
+    }
+
+
+def wait_for_idle(calls, settle=0.5, timeout=10):
+    # Background work (quiz bank refills) may still be calling the LLM after a rerun returns
+    deadline = time.monotonic() + timeout
+    seen = len(calls)
+    while time.monotonic() < deadline:
+        time.sleep(settle)
+        if len(calls) == seen:
+            return
+        seen = len(calls)
+
+
+def run_ui_rerun(iterations):
+    # A plain rerun of the Deep Study view must not call the LLM; this catches widgets or
+    # prefetches that fire on every render. Uses the replay backend through LLM_BACKEND.
+    from streamlit.testing.v1 import AppTest
+
+    app_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+    at = AppTest.from_file(app_path, default_timeout=60)
+    at.session_state["active_view"] = "📚 Deep Study"
+    at.run()
+    session = at.session_state.sessions[at.session_state.current_session_id]
+    session["current_study_topic"] = TOPICS[0]
+    session["topic_history"][TOPICS[0]] = {"timestamp": "bench", "conversations": [], "quizzes": []}
+    at.run()
+    wait_for_idle(REPLAY_CALLS)
+    del REPLAY_CALLS[:]
+
+    latencies, calls = [], []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        calls.append(len(REPLAY_CALLS))
+        del REPLAY_CALLS[:]
+    if at.exception:
+        raise SystemExit(f"App raised during the rerun benchmark: {at.exception[0].value}")
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "calls": statistics.mean(calls),
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "peak_mb": 0.0,
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Calls and tokens are deterministic, so any increase counts; timings and memory get a tolerance
+    regressions = []
+    for flow, result in results.items():
+        base = baseline.get(flow)
+        if base is None:
+            continue
+        for metric in ("calls", "prompt_tokens"):
+            if result[metric] > base[metric] + 1e-9:
+                regressions.append(f"{flow}: {metric} {base[metric]:.1f} -> {result[metric]:.1f}")
+        for metric, floor in (("p95_ms", 5.0), ("peak_mb", 1.0)):
+            if result[metric] > base[metric] * (1 + tolerance) and result[metric] - base[metric] > floor:
+                regressions.append(f"{flow}: {metric} {base[metric]:.1f} -> {result[metric]:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tutor flows against a local replay LLM backend.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--pdf-pages", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="simulated generation speed (0 = instant)")
+    parser.add_argument("--recordings", help="JSONL written with LLM_RECORD_FILE; unmatched prompts get synthetic responses")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown for timings and memory")
+    parser.add_argument("--skip-ui", action="store_true", help="skip the Streamlit rerun scenario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.update({
+            "SESSION_DB": os.path.join(workdir, "sessions.db"),
+            "DOCUMENT_DIR": os.path.join(workdir, "documents"),
+            "LLM_CACHE_DB": "",
+            "LLM_BACKEND": "replay",
+            "LLM_REPLAY_LATENCY": str(args.latency),
+            "LLM_REPLAY_TPS": str(args.tokens_per_second),
+        })
+        if args.recordings:
+            os.environ["LLM_REPLAY_FILE"] = args.recordings
+        client = ReplayLLMClient(
+            recordings=load_recordings(args.recordings) if args.recordings else None,
+            latency=args.latency,
+            tokens_per_second=args.tokens_per_second
+        )
+        service = create_service(client=client)
+
+        results = {}
+        for name, fn in build_flows(service, args.pdf_pages):
+            results[name] = run_flow(service, client, fn, args.iterations)
+        if not args.skip_ui:
+            results["ui_study_rerun"] = run_ui_rerun(args.iterations)
+        service.llm_executor.shutdown()
+
+    print(f"{'flow':<20}  {'p50 ms':>8}  {'p95 ms':>8}  {'calls':>5}  {'prompt tok':>10}  {'compl tok':>9}  {'peak MB':>7}")
+    for name, r in results.items():
+        print(f"{name:<20}  {r['p50_ms']:>8.1f}  {r['p95_ms']:>8.1f}  {r['calls']:>5.1f}  {r['prompt_tokens']:>10.0f}  "
+              f"{r['completion_tokens']:>9.0f}  {r['peak_mb']:>7.1f}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; run with --save-baseline to create one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import time
+
+from benchmarks.synthetic_pdf import make_pdf
+from pdf_ingest import default_workers, extract_pages
+
+# Run from the repository root: python -m benchmarks.bench_pdf_extract
+
+
+def time_extraction(data, workers, repeat):
+    best = None
+    pages = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages, _failed = extract_pages(data, workers=workers)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and parallel PDF text extraction.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6}  {'serial (s)':>10}  {'parallel (s)':>12}  {'workers':>7}  {'speedup':>7}")
+    for page_count in args.pages:
+        data = make_pdf(page_count)
+        serial, serial_pages = time_extraction(data, 1, args.repeat)
+        parallel, parallel_pages = time_extraction(data, args.workers, args.repeat)
+        if serial_pages != parallel_pages:
+            raise SystemExit(f"Parallel extraction changed the output for {page_count} pages")
+        print(f"{page_count:>6}  {serial:>10.3f}  {parallel:>12.3f}  {args.workers:>7}  {serial / parallel:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
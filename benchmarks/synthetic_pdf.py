@@ -0,0 +1,45 @@
+TOPICS = [
+    "CRISPR-Cas9 genome editing uses a guide RNA to direct the Cas9 nuclease to a target sequence.",
+    "The polymerase chain reaction amplifies DNA through cycles of denaturation, annealing and extension.",
+    "Recombinant insulin is produced by expressing the human gene in Escherichia coli or yeast.",
+    "Monoclonal antibodies are made by fusing B cells with myeloma cells to form hybridomas.",
+    "Plasmids carry antibiotic resistance markers that allow selection of transformed bacteria.",
+    "Restriction enzymes cut DNA at specific palindromic recognition sites.",
+    "Gel electrophoresis separates nucleic acid fragments by size in an electric field.",
+    "Bioreactors control temperature, pH and dissolved oxygen for industrial fermentation.",
+]
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(page_count, lines_per_page=30):
+    # Builds a minimal, valid text PDF by hand so benchmarks need no PDF-writing dependency
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(page_count)), page_count
+        )).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i in range(page_count):
+        lines = [f"Page {i + 1}"] + [TOPICS[(i + j) % len(TOPICS)] for j in range(lines_per_page)]
+        body = " ".join(f"({_escape(line)}) Tj 0 -14 Td" for line in lines)
+        stream = f"BT /F1 10 Tf 40 760 Td {body} ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {5 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 3 0 R >> >> >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(out)
@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from quiz_bank import DIFFICULTY_ALIASES
+
+SCORE_BUCKETS = 10
+
+ATTEMPT_COLUMNS = ["topic", "difficulty", "attempts", "correct", "questions", "pct_sum"]
+
+
+def _topic_keys(topics):
+    # Same keys as quiz_bank.topic_key, applied to a whole column of already-grouped rows
+    return topics.str.lower().str.split().str.join(" ")
+
+
+def _normalize(frame):
+    frame["topic"] = _topic_keys(frame["topic"])
+    frame["difficulty"] = frame["difficulty"].fillna("unknown").str.lower().replace(DIFFICULTY_ALIASES)
+    return frame
+
+
+class CohortAnalytics:
+    # Aggregates over every stored session and user. refresh() folds in only attempts newer than
+    # the last one it saw (one GROUP BY over an id range), so the cost tracks new data, not history.
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Bumped on every change and never reset, so callers can cache derived figures by it
+        self.version = 0
+        self._reset()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        self.last_attempt_id = 0
+        self.rows_seen = 0
+        self.attempts = 0
+        self._by_topic_difficulty = pd.DataFrame(columns=ATTEMPT_COLUMNS).set_index(["topic", "difficulty"])
+        self._histogram = np.zeros(SCORE_BUCKETS, dtype=np.int64)
+
+    def refresh(self):
+        conn = self._conn()
+        with self._lock:
+            seen = conn.execute("SELECT COUNT(*) FROM quiz_attempts WHERE id <= ?", (self.last_attempt_id,)).fetchone()[0]
+            if seen < self.rows_seen:
+                # Sessions were deleted since the last refresh; start over
+                self._reset()
+            max_id, new_rows = conn.execute(
+                "SELECT COALESCE(MAX(id), 0), COUNT(*) FROM quiz_attempts WHERE id > ?", (self.last_attempt_id,)
+            ).fetchone()
+            if not new_rows:
+                return self.version
+
+            new = pd.DataFrame(conn.execute(
+                "SELECT topic, difficulty, COUNT(*), SUM(score), SUM(total), SUM(100.0 * score / total) "
+                "FROM quiz_attempts WHERE id > ? AND id <= ? AND total > 0 GROUP BY topic, difficulty",
+                (self.last_attempt_id, max_id),
+            ).fetchall(), columns=ATTEMPT_COLUMNS)
+            if len(new):
+                new = _normalize(new).groupby(["topic", "difficulty"]).sum()
+                self._by_topic_difficulty = new.add(self._by_topic_difficulty, fill_value=0) if len(self._by_topic_difficulty) else new
+
+            buckets = conn.execute(
+                f"SELECT MIN(CAST(score * {SCORE_BUCKETS} / total AS INTEGER), {SCORE_BUCKETS - 1}), COUNT(*) "
+                "FROM quiz_attempts WHERE id > ? AND id <= ? AND total > 0 GROUP BY 1",
+                (self.last_attempt_id, max_id),
+            ).fetchall()
+            for bucket, bucket_count in buckets:
+                self._histogram[bucket] += bucket_count
+
+            self.attempts = int(self._by_topic_difficulty["attempts"].sum()) if len(self._by_topic_difficulty) else 0
+            self.last_attempt_id = max_id
+            self.rows_seen += new_rows
+            self.version += 1
+            return self.version
+
+    def summary(self):
+        conn = self._conn()
+        sessions, users = conn.execute("SELECT COUNT(*), COUNT(DISTINCT user_id) FROM sessions").fetchone()
+        with self._lock:
+            frame = self._by_topic_difficulty
+            questions = frame["questions"].sum() if len(frame) else 0
+            return {
+                "attempts": self.attempts,
+                "sessions": sessions,
+                "users": users,
+                "topics": frame.index.get_level_values("topic").nunique() if len(frame) else 0,
+                "average_score": float(frame["correct"].sum() / questions * 100) if questions else None,
+            }
+
+    def topic_table(self):
+        # One row per topic: attempts, mean score, sessions that studied it
+        with self._lock:
+            frame = self._by_topic_difficulty
+            if not len(frame):
+                # Typed columns, so sorting and filtering an empty table works like a full one
+                return pd.DataFrame(
+                    {"attempts": pd.Series(dtype="int64"), "mean": pd.Series(dtype="float64"), "studied_in": pd.Series(dtype="int64")},
+                    index=pd.Index([], name="topic", dtype="object"),
+                )
+            by_topic = frame.groupby(level="topic")[["attempts", "pct_sum"]].sum()
+        by_topic["mean"] = by_topic["pct_sum"] / by_topic["attempts"]
+        studied = pd.DataFrame(
+            self._conn().execute("SELECT topic, COUNT(*) FROM topics GROUP BY topic").fetchall(),
+            columns=["topic", "studied_in"],
+        )
+        studied = studied.groupby(_topic_keys(studied["topic"]))["studied_in"].sum()
+        by_topic["studied_in"] = studied.reindex(by_topic.index).fillna(0).astype(int)
+        by_topic["attempts"] = by_topic["attempts"].astype(int)
+        return by_topic[["attempts", "mean", "studied_in"]]
+
+    def weakest_topics(self, limit=10, min_attempts=3):
+        table = self.topic_table()
+        return table[table["attempts"] >= min_attempts].nsmallest(limit, "mean")
+
+    def difficulty_matrix(self, max_topics=30):
+        # Mean score per (topic, difficulty) for the most-attempted topics; NaN where there's no data
+        with self._lock:
+            frame = self._by_topic_difficulty
+            if not len(frame):
+                return pd.DataFrame()
+            means = (frame["pct_sum"] / frame["attempts"]).unstack("difficulty")
+            attempts = frame["attempts"].groupby(level="topic").sum()
+        return means.loc[attempts.nlargest(max_topics).index]
+
+    def score_histogram(self):
+        with self._lock:
+            return self._histogram.copy()
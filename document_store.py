@@ -0,0 +1,131 @@
+import json
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class DocumentStore:
+    # Extracted PDF text is written once per content hash and read back through
+    # mmap, so every session and process shares the OS page cache instead of
+    # holding its own copy. Page "start"/"end" are byte offsets into the text file.
+    def __init__(self, root, max_derived=16):
+        self.root = root
+        self.max_derived = max_derived
+        os.makedirs(root, exist_ok=True)
+        self._maps = {}
+        self._meta = {}
+        self._derived = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, doc_id, suffix):
+        return os.path.join(self.root, doc_id[:2], f"{doc_id}{suffix}")
+
+    def exists(self, doc_id):
+        return os.path.exists(self._path(doc_id, ".json"))
+
+    def put(self, doc_id, pages):
+        # pages: [{"page", "text"}]; returns the page offsets sessions should keep
+        if self.exists(doc_id):
+            return self.meta(doc_id)["pages"]
+        os.makedirs(os.path.dirname(self._path(doc_id, ".txt")), exist_ok=True)
+        offsets = []
+        position = 0
+        chars = 0
+        tmp_text = self._path(doc_id, f".txt.{os.getpid()}.tmp")
+        with open(tmp_text, "wb") as f:
+            for page in pages:
+                data = page["text"].encode("utf-8")
+                f.write(data)
+                offsets.append({"page": page["page"], "start": position, "end": position + len(data)})
+                position += len(data)
+                chars += len(page["text"])
+        meta = {"doc_id": doc_id, "pages": offsets, "chars": chars, "bytes": position}
+        tmp_meta = self._path(doc_id, f".json.{os.getpid()}.tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        # Text first, metadata last: a document is only visible once both are complete
+        os.replace(tmp_text, self._path(doc_id, ".txt"))
+        os.replace(tmp_meta, self._path(doc_id, ".json"))
+        return offsets
+
+    def meta(self, doc_id):
+        with self._lock:
+            meta = self._meta.get(doc_id)
+        if meta is None:
+            with open(self._path(doc_id, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            with self._lock:
+                self._meta[doc_id] = meta
+        return meta
+
+    def _map(self, doc_id):
+        with self._lock:
+            mapped = self._maps.get(doc_id)
+            if mapped is None:
+                with open(self._path(doc_id, ".txt"), "rb") as f:
+                    # mmap can't map an empty file
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+                self._maps[doc_id] = mapped
+            return mapped
+
+    def read(self, doc_id, start, end):
+        return self._map(doc_id)[start:end].decode("utf-8", errors="ignore")
+
+    def pages(self, doc_id, page_offsets=None):
+        # Decodes one page at a time; nothing is kept beyond the caller's use
+        for page in page_offsets or self.meta(doc_id)["pages"]:
+            yield {"page": page["page"], "text": self.read(doc_id, page["start"], page["end"])}
+
+    def derived(self, doc_id, kind, build):
+        # Structures built from a document's text (search index, summary chunks) hold it in
+        # memory, so only the max_derived most recently used are kept, and collected documents
+        # drop theirs. build() runs outside the lock; two threads may build the same entry.
+        key = (doc_id, kind)
+        with self._lock:
+            if key in self._derived:
+                self._derived.move_to_end(key)
+                return self._derived[key]
+        value = build()
+        with self._lock:
+            self._derived[key] = value
+            self._derived.move_to_end(key)
+            while len(self._derived) > self.max_derived:
+                self._derived.popitem(last=False)
+        return value
+
+    def _forget(self, doc_id):
+        with self._lock:
+            mapped = self._maps.pop(doc_id, None)
+            self._meta.pop(doc_id, None)
+            for key in [key for key in self._derived if key[0] == doc_id]:
+                del self._derived[key]
+        if isinstance(mapped, mmap.mmap):
+            mapped.close()
+
+    def collect_garbage(self, live_ids, grace_seconds=3600):
+        # Removes documents no session references. The grace period protects
+        # uploads that were just written but not yet saved to a session.
+        live_ids = set(live_ids)
+        cutoff = time.time() - grace_seconds
+        removed = []
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if not name.endswith(".json"):
+                    continue
+                doc_id = name[:-len(".json")]
+                meta_path = os.path.join(shard_dir, name)
+                if doc_id in live_ids or os.path.getmtime(meta_path) > cutoff:
+                    continue
+                self._forget(doc_id)
+                for suffix in (".json", ".txt"):
+                    try:
+                        os.remove(self._path(doc_id, suffix))
+                    except FileNotFoundError:
+                        pass
+                removed.append(doc_id)
+        return removed
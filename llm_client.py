@@ -0,0 +1,152 @@
+import random
+import re
+import threading
+import time
+
+import httpx
+from groq import (
+    APIConnectionError,
+    APIStatusError,
+    Groq,
+    RateLimitError,
+)
+
+from llm_metrics import add_queue_time
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class LLMUnavailableError(RuntimeError):
+    pass
+
+
+def parse_duration(value):
+    # Groq reset headers look like "2m59.56s", "7.66s" or "120ms"; retry-after is plain seconds
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART_RE.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+def retry_after_from_headers(headers):
+    if headers is None:
+        return None
+    retry_after = parse_duration(headers.get("retry-after"))
+    if retry_after is not None:
+        return retry_after
+    resets = [
+        parse_duration(headers.get(name))
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+class TokenBucket:
+    # Process-wide request limiter; every session draws from the same bucket
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute / 6.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1.0, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def pause(self, seconds):
+        # The server told us to back off; drain the bucket so other sessions wait too
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class LLMClient:
+    # One instance per process: a pooled keep-alive HTTP client, shared
+    # rate limiters and retries with exponential backoff plus full jitter.
+    def __init__(self, api_key, timeout=60.0, connect_timeout=10.0, max_retries=4,
+                 base_delay=0.5, max_delay=30.0, requests_per_minute=30, max_connections=20):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        # Groq's quotas are per model, so each model gets its own bucket
+        self.requests_per_minute = requests_per_minute
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
+        self.http_client = httpx.Client(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections, keepalive_expiry=60),
+        )
+        # Retries are handled here so they share the limiter and honour rate-limit headers
+        self.groq = Groq(api_key=api_key, http_client=self.http_client, max_retries=0)
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        response = getattr(error, "response", None)
+        hinted = retry_after_from_headers(response.headers if response is not None else None)
+        if hinted is not None:
+            delay = max(delay, min(hinted, self.max_delay))
+        return delay
+
+    def limiter(self, model):
+        if not self.requests_per_minute:
+            return None
+        with self._limiters_lock:
+            if model not in self._limiters:
+                self._limiters[model] = TokenBucket(self.requests_per_minute)
+            return self._limiters[model]
+
+    def create_chat_completion(self, max_retries=None, queue_timeout=None, **kwargs):
+        # max_retries and queue_timeout (the longest wait for the rate limiter) override the
+        # defaults, e.g. to fail over to another model sooner
+        max_retries = self.max_retries if max_retries is None else max_retries
+        queue_timeout = self.timeout if queue_timeout is None else queue_timeout
+        limiter = self.limiter(kwargs.get("model"))
+        for attempt in range(max_retries + 1):
+            waited = time.monotonic()
+            acquired = not limiter or limiter.acquire(timeout=queue_timeout)
+            add_queue_time(time.monotonic() - waited)
+            if not acquired:
+                raise LLMUnavailableError("The AI service is busy right now. Please try again in a moment.")
+            try:
+                return self.groq.chat.completions.create(**kwargs)
+            except (RateLimitError, APIConnectionError, APIStatusError) as error:
+                status = getattr(error, "status_code", None)
+                if status == 404:
+                    # Unknown or decommissioned model
+                    raise LLMUnavailableError(f"The model {kwargs.get('model')} is not available.") from error
+                retryable = isinstance(error, (RateLimitError, APIConnectionError)) or status in RETRYABLE_STATUS
+                if not retryable:
+                    raise
+                if attempt == max_retries:
+                    raise LLMUnavailableError("The AI service is unavailable right now. Please try again in a moment.") from error
+                delay = self._backoff(attempt, error)
+                if isinstance(error, RateLimitError) and limiter:
+                    limiter.pause(delay)
+                time.sleep(delay)
+                add_queue_time(delay)
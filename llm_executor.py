@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+
+from llm_metrics import add_queue_time, take_queue_time
+
+
+class LLMExecutor:
+    # Runs independent LLM calls concurrently. The pool size is the global
+    # concurrency limit; each user also gets a slot limit so one browser tab
+    # cannot occupy the whole pool.
+    def __init__(self, max_concurrency=8, per_user_limit=3, timeout=60):
+        self.max_concurrency = max_concurrency
+        self.per_user_limit = min(per_user_limit, max_concurrency)
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._user_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_user_limit))
+        self._lock = threading.Lock()
+
+    def _slot(self, user_id):
+        with self._lock:
+            return self._user_slots[user_id]
+
+    def submit(self, user_id, fn, *args, **kwargs):
+        # Waiting for a user slot blocks the caller, never a pool thread
+        queued = time.monotonic()
+        slot = self._slot(user_id)
+        if not slot.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free LLM slot for user {user_id} after {self.timeout}s")
+        return self._dispatch(slot, queued, fn, args, kwargs)
+
+    def try_submit(self, user_id, fn, *args, **kwargs):
+        # For background work: returns None instead of waiting when the user's slots are busy
+        slot = self._slot(user_id)
+        if not slot.acquire(blocking=False):
+            return None
+        return self._dispatch(slot, time.monotonic(), fn, args, kwargs)
+
+    def _dispatch(self, slot, queued, fn, args, kwargs):
+        def run():
+            # Waiting for a user slot and a pool thread counts as queue time for the task's first LLM call
+            add_queue_time(time.monotonic() - queued)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                take_queue_time()
+
+        try:
+            future = self._pool.submit(run)
+        except Exception:
+            slot.release()
+            raise
+        future.add_done_callback(lambda _future: slot.release())
+        return future
+
+    def gather(self, futures, timeout=None):
+        # Returns {name: result}; a call that failed or ran past the timeout maps to its exception
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                results[name] = TimeoutError(f"LLM call '{name}' timed out")
+            elif future.exception() is not None:
+                results[name] = future.exception()
+            else:
+                results[name] = future.result()
+        return results
+
+    def map_within(self, user_id, fn, items, timeout, progress=None):
+        # fn(item) for every item, as many at once as the user's slots allow, until timeout.
+        # Returns results in item order; an item that failed, or didn't finish in time, maps to
+        # its exception. progress(done, total) is called from the calling thread.
+        deadline = time.monotonic() + timeout
+        pending = list(enumerate(items))
+        running = {}
+        results = [None] * len(pending)
+        done = 0
+        while pending or running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            while pending:
+                future = self.try_submit(user_id, fn, pending[0][1])
+                if future is None:
+                    break
+                running[future] = pending.pop(0)[0]
+            if not running:
+                # The user's slots are held by other work (or released a moment late); retry shortly
+                time.sleep(min(0.05, remaining))
+                continue
+            finished, _running = wait(list(running), timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = running.pop(future)
+                results[index] = future.exception() if future.exception() is not None else future.result()
+                done += 1
+                if progress:
+                    progress(done, len(results))
+        for future, index in running.items():
+            future.cancel()
+            results[index] = TimeoutError(f"LLM call {index} did not finish within {timeout}s")
+        for index, _item in pending:
+            results[index] = TimeoutError(f"LLM call {index} was not started within {timeout}s")
+        return results
+
+    def run_all(self, user_id, calls, timeout=None):
+        # calls: {name: (fn, args, kwargs)}; wall-clock time is roughly the slowest call
+        futures = {name: self.submit(user_id, fn, *args, **kwargs) for name, (fn, args, kwargs) in calls.items()}
+        return self.gather(futures, timeout=timeout)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,157 @@
+import json
+from urllib.parse import urlparse
+
+QUESTION_TYPES = ("mcq", "tf", "fill")
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json_object(text):
+    # Returns the first complete JSON object in text, ignoring prose, code fences
+    # and stray braces around it; None if there isn't one
+    try:
+        value = json.loads(text)
+        if isinstance(value, dict):
+            return value
+    except ValueError:
+        pass
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _end = _decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+
+class JSONArrayStream:
+    # Incrementally pulls the objects out of {"<key>": [ {...}, {...} ]} as text arrives.
+    # Complete items are returned by feed() as soon as their closing brace is seen;
+    # items that are balanced but not valid JSON are counted in self.broken.
+    def __init__(self, key):
+        self._marker = f'"{key}"'
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._item_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.broken = 0
+
+    def feed(self, text):
+        self._buffer += text
+        items = []
+        if self._done:
+            return items
+        if not self._in_array:
+            marker = self._buffer.find(self._marker)
+            if marker == -1:
+                return items
+            bracket = self._buffer.find("[", marker + len(self._marker))
+            if bracket == -1:
+                return items
+            self._in_array = True
+            self._pos = bracket + 1
+
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._item_start is None:
+                if ch == "{":
+                    self._item_start = i
+                    self._depth = 1
+                elif ch == "]":
+                    self._done = True
+                    break
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        items.append(json.loads(buffer[self._item_start:i + 1]))
+                    except ValueError:
+                        self.broken += 1
+                    self._item_start = None
+            i += 1
+        self._pos = i
+        # Drop text that has been fully consumed so long streams don't rescan it
+        keep_from = self._item_start if self._item_start is not None else self._pos
+        self._buffer = self._buffer[keep_from:]
+        self._pos -= keep_from
+        if self._item_start is not None:
+            self._item_start = 0
+        return items
+
+
+def validate_question(q):
+    # Returns the question normalised to the shape the quiz screens render, or None
+    if not isinstance(q, dict):
+        return None
+    qtype = q.get("type", "mcq")
+    question = q.get("question")
+    explanation = q.get("explanation", "")
+    if qtype not in QUESTION_TYPES or not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(explanation, str):
+        return None
+    correct = q.get("correct")
+    if qtype == "mcq":
+        options = q.get("options")
+        if not isinstance(options, list) or len(options) < 2 or not all(isinstance(o, str) and o for o in options):
+            return None
+        if len(set(options)) != len(options):
+            return None
+        if isinstance(correct, str) and correct.isdigit():
+            correct = int(correct)
+        if not isinstance(correct, int) or isinstance(correct, bool) or not 0 <= correct < len(options):
+            return None
+        return {"type": "mcq", "question": question, "options": options, "correct": correct, "explanation": explanation}
+    if qtype == "tf":
+        if isinstance(correct, bool):
+            correct = "True" if correct else "False"
+        if not isinstance(correct, str) or correct.strip().capitalize() not in ("True", "False"):
+            return None
+        return {"type": "tf", "question": question, "correct": correct.strip().capitalize(), "explanation": explanation}
+    if not isinstance(correct, str) or not correct.strip():
+        return None
+    return {"type": "fill", "question": question, "correct": correct.strip(), "explanation": explanation}
+
+
+def validate_resource(r):
+    if not isinstance(r, dict):
+        return None
+    title, url = r.get("title"), r.get("url")
+    if not isinstance(title, str) or not title.strip() or not isinstance(url, str):
+        return None
+    if urlparse(url).scheme not in ("http", "https"):
+        return None
+    description = r.get("description", "")
+    resource_type = r.get("type", "Resource")
+    return {
+        "title": title.strip(),
+        "url": url.strip(),
+        "description": description if isinstance(description, str) else "",
+        "type": resource_type if isinstance(resource_type, str) else "Resource",
+    }
+
+
+def validate_items(items, validator):
+    # Splits items into (valid, number_broken)
+    valid = [v for v in (validator(item) for item in items) if v is not None]
+    return valid, len(items) - len(valid)
@@ -0,0 +1,265 @@
+import os
+import threading
+from collections import deque
+
+import httpx
+
+# Seconds; shared by the latency, time-to-first-token and queue histograms
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+OUTCOMES = ("ok", "cache_hit", "error", "cancelled")
+
+# USD per million (prompt, completion) tokens on Groq's on-demand tier
+MODEL_PRICES = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+}
+
+# Seconds the current thread has spent waiting for an executor worker, the rate limiter or a
+# retry backoff since the last LLM call was recorded
+_queue = threading.local()
+
+
+def add_queue_time(seconds):
+    _queue.seconds = getattr(_queue, "seconds", 0.0) + seconds
+
+
+def take_queue_time():
+    seconds = getattr(_queue, "seconds", 0.0)
+    _queue.seconds = 0.0
+    return seconds
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class _SiteStats:
+    def __init__(self):
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = _Histogram()
+        self.ttft = _Histogram()
+        self.queue = _Histogram()
+
+
+class LLMMetrics:
+    # Per call-site LLM telemetry: counters and histograms in Prometheus text format,
+    # plus one span per call for an optional exporter (see OTLPSpanExporter)
+    def __init__(self, exporter=None, prices=None, recent=200):
+        self.exporter = exporter
+        self.prices = MODEL_PRICES if prices is None else prices
+        self._lock = threading.Lock()
+        self._sites = {}
+        # {(site, section): [prompts trimmed, items dropped, tokens dropped]}
+        self._trims = {}
+        self._recent = deque(maxlen=recent)
+
+    def record(self, site, model, outcome, started, latency, ttft=None, queue=0.0, prompt_tokens=0, completion_tokens=0):
+        # started is a time.time() wall-clock timestamp; durations are in seconds
+        with self._lock:
+            stats = self._sites.get((site, model))
+            if stats is None:
+                stats = self._sites[(site, model)] = _SiteStats()
+            stats.outcomes[outcome] += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.latency.observe(latency)
+            stats.queue.observe(queue)
+            if ttft is not None:
+                stats.ttft.observe(ttft)
+            call = {
+                "site": site, "model": model, "outcome": outcome, "started": started, "latency": latency,
+                "ttft": ttft, "queue": queue, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            }
+            self._recent.append(call)
+        if self.exporter is not None:
+            self.exporter.export(call)
+
+    def record_trim(self, site, dropped):
+        # dropped: [{"section", "items", "tokens"}] from prompt_budget.fit_prompt
+        with self._lock:
+            for entry in dropped:
+                trim = self._trims.setdefault((site, entry["section"]), [0, 0, 0])
+                trim[0] += 1
+                trim[1] += entry["items"]
+                trim[2] += entry["tokens"]
+
+    def trims(self):
+        with self._lock:
+            return [
+                {"site": site, "section": section, "prompts_trimmed": prompts, "items_dropped": items, "tokens_dropped": tokens}
+                for (site, section), (prompts, items, tokens) in sorted(self._trims.items())
+            ]
+
+    def cost(self, model, prompt_tokens, completion_tokens):
+        prompt_price, completion_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+    def summary(self):
+        # One row per (site, model), for the admin panel
+        rows = []
+        with self._lock:
+            for (site, model), stats in self._sites.items():
+                calls = sum(stats.outcomes.values())
+                made = calls - stats.outcomes["cache_hit"]
+                rows.append({
+                    "site": site,
+                    "model": model,
+                    "calls": calls,
+                    "cache_hits": stats.outcomes["cache_hit"],
+                    "errors": stats.outcomes["error"],
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                    "cost_usd": self.cost(model, stats.prompt_tokens, stats.completion_tokens),
+                    "total_seconds": stats.latency.sum,
+                    "mean_latency": stats.latency.sum / calls if calls else 0.0,
+                    "mean_ttft": stats.ttft.sum / stats.ttft.count if stats.ttft.count else None,
+                    "mean_queue": stats.queue.sum / made if made else 0.0,
+                })
+        return rows
+
+    def top_sites(self, key="total_seconds", limit=10):
+        return sorted(self.summary(), key=lambda row: row[key], reverse=True)[:limit]
+
+    def recent_calls(self):
+        with self._lock:
+            return list(self._recent)
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP llm_calls_total LLM calls by call site, model and outcome.",
+            "# TYPE llm_calls_total counter",
+        ]
+        with self._lock:
+            sites = sorted(self._sites.items())
+            for (site, model), stats in sites:
+                for outcome, count in stats.outcomes.items():
+                    lines.append(f"llm_calls_total{_labels(site=site, model=model, outcome=outcome)} {count}")
+            lines += ["# HELP llm_tokens_total Tokens sent and received by call site and model.", "# TYPE llm_tokens_total counter"]
+            for (site, model), stats in sites:
+                lines.append(f"llm_tokens_total{_labels(site=site, model=model, kind='prompt')} {stats.prompt_tokens}")
+                lines.append(f"llm_tokens_total{_labels(site=site, model=model, kind='completion')} {stats.completion_tokens}")
+            lines += ["# HELP llm_cost_usd_total Estimated spend from MODEL_PRICES by call site and model.", "# TYPE llm_cost_usd_total counter"]
+            for (site, model), stats in sites:
+                lines.append(f"llm_cost_usd_total{_labels(site=site, model=model)} {self.cost(model, stats.prompt_tokens, stats.completion_tokens)}")
+            lines += ["# HELP llm_prompt_trims_total Prompts whose section had to be cut to fit its token budget.", "# TYPE llm_prompt_trims_total counter"]
+            trims = sorted(self._trims.items())
+            for (site, section), (prompts, _items, _tokens) in trims:
+                lines.append(f"llm_prompt_trims_total{_labels(site=site, section=section)} {prompts}")
+            lines += ["# HELP llm_prompt_dropped_tokens_total Tokens cut from prompt sections to fit their budgets.", "# TYPE llm_prompt_dropped_tokens_total counter"]
+            for (site, section), (_prompts, _items, tokens) in trims:
+                lines.append(f"llm_prompt_dropped_tokens_total{_labels(site=site, section=section)} {tokens}")
+            for name, attr, help_text in (
+                ("llm_latency_seconds", "latency", "LLM call latency, including rate-limiter waits and retries."),
+                ("llm_ttft_seconds", "ttft", "Time to first token (whole response for non-streaming calls)."),
+                ("llm_queue_seconds", "queue", "Time spent waiting for a worker, the rate limiter or retry backoff."),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (site, model), stats in sites:
+                    histogram = getattr(stats, attr)
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(site=site, model=model, le=bound)} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(site=site, model=model, le='+Inf')} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(site=site, model=model)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels(site=site, model=model)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class OTLPSpanExporter:
+    # Sends calls as OTLP/HTTP JSON spans (GenAI semantic conventions) to a local collector.
+    # Spans are batched on a daemon thread; if the collector is down they are dropped, never retried.
+    def __init__(self, endpoint, service_name="biotech-tutor", interval=5.0, max_queue=2048, max_batch=512):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.interval = interval
+        self.max_batch = max_batch
+        self._queue = deque(maxlen=max_queue)
+        self._wake = threading.Event()
+        self._http = httpx.Client(timeout=5.0)
+        self.dropped = 0
+        threading.Thread(target=self._run, name="otlp-export", daemon=True).start()
+
+    def export(self, call):
+        self._queue.append(call)
+        if len(self._queue) >= self.max_batch:
+            self._wake.set()
+
+    def _span(self, call):
+        start_ns = int(call["started"] * 1e9)
+        attributes = [
+            _attribute("gen_ai.system", "groq"),
+            _attribute("gen_ai.operation.name", "chat"),
+            _attribute("gen_ai.request.model", call["model"]),
+            _attribute("gen_ai.usage.input_tokens", call["prompt_tokens"]),
+            _attribute("gen_ai.usage.output_tokens", call["completion_tokens"]),
+            _attribute("llm.call_site", call["site"]),
+            _attribute("llm.outcome", call["outcome"]),
+            _attribute("llm.cache_hit", call["outcome"] == "cache_hit"),
+            _attribute("llm.queue_seconds", float(call["queue"])),
+        ]
+        if call["ttft"] is not None:
+            attributes.append(_attribute("llm.time_to_first_token_seconds", float(call["ttft"])))
+        return {
+            "traceId": os.urandom(16).hex(),
+            "spanId": os.urandom(8).hex(),
+            "name": f"chat {call['model']}",
+            "kind": 3,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(call["latency"] * 1e9)),
+            "attributes": attributes,
+            "status": {"code": 2 if call["outcome"] == "error" else 1},
+        }
+
+    def flush(self):
+        batch = []
+        while self._queue and len(batch) < self.max_batch:
+            batch.append(self._queue.popleft())
+        if not batch:
+            return
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "llm_metrics"}, "spans": [self._span(call) for call in batch]}],
+        }]}
+        try:
+            self._http.post(self.url, json=payload).raise_for_status()
+        except httpx.HTTPError:
+            self.dropped += len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
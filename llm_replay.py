@@ -0,0 +1,189 @@
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from llm_cache import make_cache_key
+
+# Stand-in LLM backends with the same create_chat_completion() interface as LLMClient.
+# ReplayLLMClient answers from recorded responses (or deterministic synthetic ones) with
+# simulated latency, so flows can be run and measured without the Groq API.
+# RecordingLLMClient wraps a real client and writes what it returns for later replay.
+
+
+# Calls made by the replay backend that create_service() builds from LLM_BACKEND=replay;
+# lets a harness count calls when it drives the Streamlit app in-process
+REPLAY_CALLS = []
+
+
+def estimate_tokens(text):
+    # Roughly what Llama tokenizers produce for English prose
+    return max(1, len(text) // 4) if text else 0
+
+
+def recording_key(kwargs):
+    # The same key whether the call was recorded streaming or not
+    messages = kwargs["messages"]
+    params = {"response_format": kwargs["response_format"]} if kwargs.get("response_format") else {}
+    return make_cache_key(kwargs["model"], messages[0]["content"], messages[-1]["content"], params)
+
+
+def load_recordings(path):
+    recordings = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                recordings[entry["key"]] = entry["response"]
+    return recordings
+
+
+FILLER = (
+    "Biotechnology applies living systems and molecular tools to practical problems. "
+    "Enzymes, vectors and host cells are chosen so each step can be measured and controlled. "
+)
+
+
+def synthetic_response(prompt, json_mode=False, length=1200):
+    # Deterministic output shaped like each prompt template expects
+    if "Answer ONLY 'yes' or 'no'" in prompt:
+        return "yes"
+    if '"questions"' in prompt:
+        match = re.search(r" with (\d+) ", prompt)
+        count = int(match.group(1)) if match else 5
+        digest = make_cache_key("", "", prompt)[:8]
+        return json.dumps({"questions": [
+            {"type": "mcq", "question": f"Question {i + 1} ({digest}): which step comes first?",
+             "options": ["Denaturation", "Annealing", "Extension", "Ligation"], "correct": 0,
+             "explanation": "Strands must separate before primers can bind."}
+            for i in range(count)
+        ]})
+    if '"resources"' in prompt:
+        return json.dumps({"resources": [
+            {"title": f"Resource {i + 1}", "url": f"https://example.org/biotech/{i + 1}",
+             "description": "Introductory reading.", "type": "Article"}
+            for i in range(5)
+        ]})
+    if '"covered"' in prompt:
+        pages = sorted({int(p) for p in re.findall(r"\[Page (\d+)\]", prompt)})[:2]
+        return json.dumps({"covered": bool(pages), "answer": FILLER.strip() if pages else "", "pages": pages})
+    text = (FILLER * (length // len(FILLER) + 1))[:length]
+    return json.dumps({"text": text}) if json_mode else text
+
+
+class _ReplayStream:
+    def __init__(self, chunks, delay):
+        self._chunks = chunks
+        self._delay = delay
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self.closed:
+                return
+            if self._delay:
+                time.sleep(self._delay)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class ReplayLLMClient:
+    # latency: seconds before the first token; tokens_per_second: generation speed after that
+    def __init__(self, recordings=None, latency=0.0, tokens_per_second=0.0, response_length=1200, chunk_tokens=8, calls=None):
+        self.recordings = recordings or {}
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_length = response_length
+        self.chunk_tokens = chunk_tokens
+        self._lock = threading.Lock()
+        self.calls = [] if calls is None else calls
+
+    def _record_call(self, kwargs, prompt_tokens, completion_tokens, replayed):
+        with self._lock:
+            self.calls.append({
+                "model": kwargs["model"],
+                "stream": bool(kwargs.get("stream")),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "replayed": replayed,
+            })
+
+    def reset(self):
+        with self._lock:
+            calls = list(self.calls)
+            del self.calls[:]
+        return calls
+
+    def create_chat_completion(self, **kwargs):
+        key = recording_key(kwargs)
+        replayed = key in self.recordings
+        prompt = kwargs["messages"][-1]["content"]
+        text = self.recordings[key] if replayed else synthetic_response(
+            prompt, json_mode=bool(kwargs.get("response_format")), length=self.response_length
+        )
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in kwargs["messages"])
+        completion_tokens = estimate_tokens(text)
+        self._record_call(kwargs, prompt_tokens, completion_tokens, replayed)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        if self.latency:
+            time.sleep(self.latency)
+
+        if kwargs.get("stream"):
+            step = self.chunk_tokens * 4
+            pieces = [text[i:i + step] for i in range(0, len(text), step)]
+            chunks = [
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)], usage=None)
+                for piece in pieces
+            ]
+            chunks.append(SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")], usage=usage))
+            delay = self.chunk_tokens / self.tokens_per_second if self.tokens_per_second else 0
+            return _ReplayStream(chunks, delay)
+
+        if self.tokens_per_second:
+            time.sleep(completion_tokens / self.tokens_per_second)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason="stop")],
+            usage=usage
+        )
+
+
+class _RecordingStream:
+    def __init__(self, stream, on_complete):
+        self._stream = stream
+        self._on_complete = on_complete
+
+    def __iter__(self):
+        parts = []
+        for chunk in self._stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+            yield chunk
+        self._on_complete("".join(parts))
+
+    def close(self):
+        self._stream.close()
+
+
+class RecordingLLMClient:
+    # Appends one JSON line per completed call to path; load_recordings() reads them back
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _write(self, kwargs, text):
+        entry = {"key": recording_key(kwargs), "model": kwargs["model"], "prompt": kwargs["messages"][-1]["content"][:200], "response": text}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def create_chat_completion(self, **kwargs):
+        response = self.client.create_chat_completion(**kwargs)
+        if kwargs.get("stream"):
+            return _RecordingStream(response, lambda text: self._write(kwargs, text))
+        self._write(kwargs, response.choices[0].message.content)
+        return response
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+
+LARGE_MODEL = "llama-3.3-70b-versatile"
+SMALL_MODEL = "llama-3.1-8b-instant"
+
+# Each call site declares one of these task classes. models is the preference order: later
+# models are fallbacks for when the earlier ones are rate-limited or unavailable.
+DEFAULT_ROUTES = {
+    # One-word answers (topic checks)
+    "classify": {"models": [SMALL_MODEL, LARGE_MODEL], "max_tokens": 8, "temperature": 0.0},
+    # Condensing given text (chunk summaries and merges)
+    "extract": {"models": [SMALL_MODEL, LARGE_MODEL], "max_tokens": 1024, "temperature": 0.2},
+    # Student-facing prose (explanations, answers, summaries, feedback)
+    "generate-long": {"models": [LARGE_MODEL, SMALL_MODEL], "max_tokens": 4096, "temperature": 0.7},
+    # Structured output (quizzes, resources, grounded answers)
+    "generate-json": {"models": [LARGE_MODEL, SMALL_MODEL], "max_tokens": 4096, "temperature": 0.3},
+}
+
+# A model with a fallback gets this many retries, and waits this long for its rate limiter,
+# before the fallback is tried
+FALLBACK_RETRIES = 1
+FALLBACK_QUEUE_TIMEOUT = 5.0
+
+
+def load_routes():
+    # Overrides per task class, e.g. LLM_ROUTE_CLASSIFY="llama-3.1-8b-instant,llama-3.3-70b-versatile",
+    # LLM_ROUTE_GENERATE_LONG_MAX_TOKENS=2048, LLM_ROUTE_EXTRACT_TEMPERATURE=0
+    routes = {}
+    for task, route in DEFAULT_ROUTES.items():
+        prefix = "LLM_ROUTE_" + task.upper().replace("-", "_")
+        models = [m.strip() for m in os.getenv(prefix, "").split(",") if m.strip()]
+        routes[task] = {
+            "models": models or list(route["models"]),
+            "max_tokens": int(os.getenv(prefix + "_MAX_TOKENS", route["max_tokens"])),
+            "temperature": float(os.getenv(prefix + "_TEMPERATURE", route["temperature"])),
+        }
+    return routes
+
+
+class ModelRouter:
+    # Shared by every session: a model that just failed is skipped for cooldown seconds, so
+    # later calls go straight to the fallback instead of waiting out the same rate limit
+    def __init__(self, routes, cooldown=30.0):
+        self.routes = routes
+        self.cooldown = cooldown
+        self._unavailable_until = {}
+        self._lock = threading.Lock()
+
+    def primary(self, task):
+        return self.routes[task]["models"][0]
+
+    def candidates(self, task):
+        # Models to try in order; cooling-down ones go last rather than being dropped
+        models = self.routes[task]["models"]
+        now = time.monotonic()
+        with self._lock:
+            ready = [m for m in models if self._unavailable_until.get(m, 0) <= now]
+        return ready + [m for m in models if m not in ready]
+
+    def mark_unavailable(self, model):
+        with self._lock:
+            self._unavailable_until[model] = time.monotonic() + self.cooldown
+
+    def mark_available(self, model):
+        with self._lock:
+            self._unavailable_until.pop(model, None)
@@ -0,0 +1,124 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PyPDF2 import PdfReader
+
+logger = logging.getLogger(__name__)
+
+class UnreadablePdfError(ValueError):
+    pass
+
+
+# Below this many pages a process pool costs more to start than it saves
+PARALLEL_MIN_PAGES = 40
+# Workers must not fork the app process: it runs threads (Streamlit, the LLM executor) whose
+# locks a forked child could inherit held. forkserver isn't available on Windows.
+POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def default_workers():
+    configured = os.getenv("PDF_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return max(1, min(8, (os.cpu_count() or 1) - 1))
+
+
+def _extract_page(page):
+    # A broken page yields empty text plus the error instead of sinking the whole document
+    try:
+        return page.extract_text() or "", None
+    except Exception as exc:
+        return "", f"{type(exc).__name__}: {exc}"
+
+
+# Set in each worker process by _init_worker
+_worker_reader = None
+
+
+def _init_worker(data):
+    # The PDF bytes reach each worker once, through the pool initializer, and every worker
+    # keeps one reader for all the page ranges it is given
+    global _worker_reader
+    _worker_reader = PdfReader(io.BytesIO(data))
+
+
+def _extract_page_range(start, stop):
+    results = []
+    for i in range(start, stop):
+        text, error = _extract_page(_worker_reader.pages[i])
+        results.append((i + 1, text, error))
+    return results
+
+
+def iter_pdf_pages(data):
+    # Yields (page_number, text, error, page_count) one page at a time so callers can report progress
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    for i, page in enumerate(reader.pages):
+        text, error = _extract_page(page)
+        yield i + 1, text, error, page_count
+
+
+def iter_pdf_pages_parallel(data, workers, page_count, chunk_size=None):
+    # Yields the same tuples as iter_pdf_pages, but in completion order of page ranges
+    if chunk_size is None:
+        # A few ranges per worker keeps progress moving without paying per-page IPC
+        chunk_size = max(1, -(-page_count // (workers * 4)))
+    ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+    context = multiprocessing.get_context(POOL_START_METHOD)
+    if POOL_START_METHOD == "forkserver":
+        # Workers fork from a server that has already imported this module (and PyPDF2)
+        context.set_forkserver_preload([__name__])
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(data,)) as pool:
+        futures = [pool.submit(_extract_page_range, start, stop) for start, stop in ranges]
+        for future in as_completed(futures):
+            for page_number, text, error in future.result():
+                yield page_number, text, error, page_count
+
+
+def build_document(doc_id, page_texts, failed_pages=None):
+    return {
+        "doc_id": doc_id,
+        "pages": [{"page": page_number, "text": text} for page_number, text in page_texts],
+        "failed_pages": failed_pages or {},
+    }
+
+
+def extract_pages(data, workers=1, progress=None):
+    # Returns ([(page_number, text)], {page_number: error}) in page order
+    page_texts = []
+    failed_pages = {}
+    page_count = len(PdfReader(io.BytesIO(data)).pages) if workers > 1 else 0
+    if page_count >= PARALLEL_MIN_PAGES:
+        pages = iter_pdf_pages_parallel(data, workers, page_count)
+    else:
+        pages = iter_pdf_pages(data)
+    for done, (page_number, text, error, page_count) in enumerate(pages, 1):
+        page_texts.append((page_number, text))
+        if error:
+            failed_pages[page_number] = error
+        if progress:
+            progress(done, page_count)
+    page_texts.sort()
+    return page_texts, failed_pages
+
+
+def ingest_pdf(data, progress=None, workers=1, doc_id=None):
+    # doc_id: the file's digest when the caller already has it
+    doc_id = doc_id or file_digest(data)
+    try:
+        page_texts, failed_pages = extract_pages(data, workers=workers, progress=progress)
+    except Exception as exc:
+        # Any parse failure (bad xref, missing keys, ...) is reported as one error type, and
+        # nothing gets stored under the file's hash, so a fixed re-upload is parsed again
+        logger.exception("Could not extract text from PDF %s", doc_id)
+        raise UnreadablePdfError("Could not read this PDF. It may be damaged or encrypted.") from exc
+    return build_document(doc_id, page_texts, failed_pages)
@@ -0,0 +1,185 @@
+import os
+import re
+import threading
+import time
+
+import tiktoken
+
+# Context windows of the Groq models we call, in tokens
+MODEL_CONTEXT_TOKENS = {
+    "llama-3.3-70b-versatile": 131072,
+    "llama-3.1-8b-instant": 131072,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+# Kept free in the window for the response
+OUTPUT_RESERVE_TOKENS = 2048
+
+# Prompt limits per call site, in tokens: "total" covers the whole request including the system
+# message, the other keys cap one section each. The totals keep single requests well inside
+# Groq's per-minute token quotas, where an oversized request is rejected rather than queued.
+PROMPT_BUDGETS = {
+    "document_summary": {"total": 3500, "document": 1600, "sections": 3000},
+    "summary_map": {"total": 2500, "chunk": 1800},
+    "summary_reduce": {"total": 3500, "sections": 3000},
+    "document_answer": {"total": 3000, "question": 300, "context": 2000},
+    "study_answer": {"total": 2500, "question": 300, "history": 1200},
+    "suggestions": {"total": 1000, "topics": 400},
+    "feedback": {"total": 2500, "learning_path": 400, "quiz_scores": 1200},
+}
+
+PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+# How long a prompt build waits for the encoding to load before counting with the approximation
+ENCODING_LOAD_TIMEOUT = float(os.getenv("TIKTOKEN_LOAD_TIMEOUT", "5"))
+
+_encoding = None
+_encoding_loaded = threading.Event()
+_encoding_deadline = None
+_encoding_lock = threading.Lock()
+
+
+def _load_encoding():
+    global _encoding
+    try:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        _encoding = False
+    finally:
+        _encoding_loaded.set()
+
+
+def _get_encoding():
+    # cl100k_base is within a few percent of Llama 3's tokenizer on English text. Point
+    # TIKTOKEN_CACHE_DIR at a directory holding the encoding file to load it from disk; otherwise
+    # tiktoken downloads it, with no timeout, so that happens on a background thread. Callers wait
+    # at most ENCODING_LOAD_TIMEOUT in total and approximate until (unless) the load finishes.
+    global _encoding_deadline
+    with _encoding_lock:
+        if _encoding_deadline is None:
+            _encoding_deadline = time.monotonic() + ENCODING_LOAD_TIMEOUT
+            threading.Thread(target=_load_encoding, name="tiktoken-load", daemon=True).start()
+    _encoding_loaded.wait(max(0.0, _encoding_deadline - time.monotonic()))
+    return _encoding or False
+
+
+def _pieces(text):
+    # Offline approximation: a token per punctuation mark and per 6 characters of a word,
+    # which errs slightly high on English prose
+    for match in PIECE_RE.finditer(text):
+        yield match.end(), (len(match.group()) + 5) // 6
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(tokens for _end, tokens in _pieces(text))
+
+
+def _cut(text, max_tokens, keep="head"):
+    # One tokenizer pass: returns (kept text, its tokens, tokens in the whole text).
+    # keep="head" keeps the start of the text, "tail" the end.
+    if max_tokens <= 0:
+        return "", 0, count_tokens(text)
+    encoding = _get_encoding()
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text, len(tokens), len(tokens)
+        kept = tokens[:max_tokens] if keep == "head" else tokens[-max_tokens:]
+        return encoding.decode(kept), max_tokens, len(tokens)
+    if keep == "tail":
+        fitted, used, total = _cut(text[::-1], max_tokens)
+        return fitted[::-1], used, total
+    used = total = cut = 0
+    for end, tokens in _pieces(text):
+        total += tokens
+        if total <= max_tokens:
+            used = total
+            cut = end
+    if total <= max_tokens:
+        return text, total, total
+    return text[:cut], used, total
+
+
+def truncate(text, max_tokens, keep="head"):
+    return _cut(text, max_tokens, keep)[0]
+
+
+class TextSection:
+    def __init__(self, name, text, keep="head"):
+        self.name = name
+        self.text = text
+        self.keep = keep
+
+    def fit(self, limit):
+        # Returns (text, tokens used, dropped entry or None)
+        fitted, used, total = _cut(self.text, limit, self.keep)
+        if used == total:
+            return fitted, used, None
+        return fitted, used, {"section": self.name, "items": 0, "tokens": total - used}
+
+
+class ItemSection:
+    # Whole items (conversation turns, retrieved chunks, quiz attempts) are kept or dropped.
+    # keep="head" prefers the first items, "tail" the last; the kept ones stay in their original order.
+    # summarize(dropped_items) returns a short stand-in for what didn't fit; a fifth of the limit is held for it.
+    def __init__(self, name, items, render, keep="head", join=None, summarize=None):
+        self.name = name
+        self.items = list(items)
+        self.render = render
+        self.keep = keep
+        self.join = join or (lambda items: "\n".join(self.render(item) for item in items))
+        self.summarize = summarize
+        # The items that made it into the prompt, set by fit()
+        self.kept = []
+
+    def fit(self, limit):
+        available = limit - limit // 5 if self.summarize else limit
+        ordered = self.items if self.keep == "head" else self.items[::-1]
+        kept = []
+        used = 0
+        for item in ordered:
+            cost = count_tokens(self.render(item)) + 1
+            if used + cost > available:
+                break
+            kept.append(item)
+            used += cost
+        dropped = ordered[len(kept):]
+        if self.keep == "tail":
+            kept.reverse()
+            dropped.reverse()
+        self.kept = kept
+        text = self.join(kept)
+        if not dropped:
+            return text, used, None
+
+        entry = {"section": self.name, "items": len(dropped), "tokens": sum(count_tokens(self.render(item)) for item in dropped)}
+        if self.summarize:
+            summary, summary_tokens, _total = _cut(self.summarize(dropped), limit - used - 1)
+            if summary:
+                parts = [summary, text] if self.keep == "tail" else [text, summary]
+                text = "\n".join(part for part in parts if part)
+                used += summary_tokens + 1
+        return text, used, entry
+
+
+def fit_prompt(site, model, system_msg, render, sections):
+    # render(**texts) builds the prompt from one text per section name. Sections are fitted in
+    # order, each to min(its own budget, what is left of the site's total), so put the ones that
+    # matter most first. Returns (prompt, dropped) where dropped lists what had to be cut.
+    budgets = PROMPT_BUDGETS.get(site, {})
+    window = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS) - OUTPUT_RESERVE_TOKENS
+    remaining = min(budgets.get("total", window), window)
+    remaining -= count_tokens(system_msg) + count_tokens(render(**{section.name: "" for section in sections}))
+    texts = {}
+    dropped = []
+    for section in sections:
+        limit = max(0, min(budgets.get(section.name, remaining), remaining))
+        texts[section.name], used, entry = section.fit(limit)
+        remaining -= used
+        if entry:
+            dropped.append(entry)
+    return render(**texts), dropped
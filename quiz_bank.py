@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from llm_json import validate_question
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quiz_questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic_key TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    qtype TEXT NOT NULL,
+    question_hash TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    -- A question may be banked under several topics or difficulties. Also indexes lookups by key.
+    UNIQUE (topic_key, difficulty, qtype, question_hash)
+);
+
+CREATE TABLE IF NOT EXISTS quiz_seen (
+    user_id TEXT NOT NULL,
+    question_id INTEGER NOT NULL REFERENCES quiz_questions (id) ON DELETE CASCADE,
+    PRIMARY KEY (user_id, question_id)
+);
+"""
+
+# Both quiz screens name the middle level differently; they share one bank
+DIFFICULTY_ALIASES = {"medium": "intermediate"}
+
+
+def topic_key(topic):
+    return " ".join(topic.lower().split())
+
+
+def difficulty_key(difficulty):
+    key = difficulty.lower()
+    return DIFFICULTY_ALIASES.get(key, key)
+
+
+def question_hash(q):
+    return hashlib.sha256(" ".join(q["question"].lower().split()).encode("utf-8")).hexdigest()
+
+
+class QuizBank:
+    # Validated questions indexed by (topic, difficulty, type), shared by every user
+    def __init__(self, db_path, target_size=15, refill_interval=300):
+        self.db_path = db_path
+        self.target_size = target_size
+        self.refill_interval = refill_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._refilling = set()
+        self._last_refill = {}
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def add(self, topic, difficulty, questions):
+        # Stores valid questions under their own type and returns their ids (existing ones included)
+        conn = self._conn()
+        ids = []
+        with conn:
+            conn.execute("BEGIN")
+            for q in questions:
+                q = validate_question(q)
+                if q is None:
+                    continue
+                digest = question_hash(q)
+                key = (topic_key(topic), difficulty_key(difficulty), q["type"], digest)
+                conn.execute(
+                    "INSERT OR IGNORE INTO quiz_questions (topic_key, difficulty, qtype, question_hash, payload, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, json.dumps(q), time.time()),
+                )
+                ids.append(conn.execute(
+                    "SELECT id FROM quiz_questions WHERE topic_key = ? AND difficulty = ? AND qtype = ? AND question_hash = ?",
+                    key,
+                ).fetchone()[0])
+        return ids
+
+    def size(self, topic, difficulty, qtype):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM quiz_questions WHERE topic_key = ? AND difficulty = ? AND qtype = ?",
+            (topic_key(topic), difficulty_key(difficulty), qtype),
+        ).fetchone()[0]
+
+    def sample(self, topic, difficulty, qtypes, count, user_id):
+        # Serves only questions this user hasn't seen; returns None if the bank can't fill the quiz
+        placeholders = ",".join("?" for _ in qtypes)
+        rows = self._conn().execute(
+            f"SELECT id, payload FROM quiz_questions WHERE topic_key = ? AND difficulty = ? AND qtype IN ({placeholders}) "
+            "AND id NOT IN (SELECT question_id FROM quiz_seen WHERE user_id = ?)",
+            (topic_key(topic), difficulty_key(difficulty), *qtypes, user_id),
+        ).fetchall()
+        if len(rows) < count:
+            return None
+        chosen = random.sample(rows, count)
+        self.mark_seen(user_id, [row[0] for row in chosen])
+        return [json.loads(row[1]) for row in chosen]
+
+    def mark_seen(self, user_id, question_ids):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR IGNORE INTO quiz_seen (user_id, question_id) VALUES (?, ?)",
+                [(user_id, question_id) for question_id in question_ids],
+            )
+
+    def schedule_refill(self, topic, difficulty, qtype, submit, generate):
+        # submit(fn) runs fn in the background and returns None if it can't right now;
+        # generate() returns a list of questions.
+        # At most one refill per key is in flight, and a key is retried at most every refill_interval.
+        key = (topic_key(topic), difficulty_key(difficulty), qtype)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._refilling or now - self._last_refill.get(key, -self.refill_interval) < self.refill_interval:
+                return False
+            self._refilling.add(key)
+            self._last_refill[key] = now
+        if self.size(topic, difficulty, qtype) >= self.target_size:
+            with self._lock:
+                self._refilling.discard(key)
+            return False
+
+        def refill():
+            try:
+                self.add(topic, difficulty, generate())
+            finally:
+                with self._lock:
+                    self._refilling.discard(key)
+
+        try:
+            scheduled = submit(refill) is not None
+        except Exception:
+            scheduled = False
+        if not scheduled:
+            with self._lock:
+                self._refilling.discard(key)
+                self._last_refill.pop(key, None)
+        return scheduled
@@ -0,0 +1,128 @@
+import json
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+
+from quiz_bank import question_hash
+
+# One LLM call asks for at most this many questions; longer outputs truncate more often
+MAX_QUESTIONS_PER_CALL = 10
+# Extra calls per set when duplicates or invalid items leave it short of its count
+MAX_TOPUP_CALLS = 2
+
+
+def normalize_specs(specs):
+    # specs: [{"topic", "difficulty", "type", "count"}]. Identical (topic, difficulty, type)
+    # rows are merged so their questions come from the same calls.
+    merged = {}
+    for spec in specs:
+        topic = " ".join(str(spec.get("topic") or "").split())
+        count = int(spec.get("count") or 0)
+        if not topic or count <= 0:
+            continue
+        key = (topic.lower(), spec.get("difficulty", "Medium"), spec.get("type", "mcq"))
+        if key in merged:
+            merged[key]["count"] += count
+        else:
+            merged[key] = {"topic": topic, "difficulty": key[1], "type": key[2], "count": count}
+    return list(merged.values())
+
+
+def pack_requests(specs, max_per_call=MAX_QUESTIONS_PER_CALL):
+    # Splits every spec into calls of at most max_per_call questions
+    calls = []
+    for index, spec in enumerate(specs):
+        remaining = spec["count"]
+        while remaining > 0:
+            size = min(remaining, max_per_call)
+            calls.append((index, size))
+            remaining -= size
+    return calls
+
+
+def run_quiz_batch(specs, generate, executor, user_id, bank=None, on_result=None, timeout=None):
+    # generate(topic, difficulty, qtype, count, avoid=[stems]) -> [question]. Calls run concurrently
+    # through the LLM executor (bounded by the user's slots and the shared rate limiter). A set's
+    # later calls are told the stems it already has, results are deduplicated by question_hash,
+    # and a set left short by duplicates gets up to MAX_TOPUP_CALLS more calls. Each finished call's
+    # new questions are added to the bank and reported through on_result(spec, questions, done, total).
+    specs = normalize_specs(specs)
+    pending = pack_requests(specs)
+    total = len(pending)
+    results = [dict(spec, questions=[], failed_calls=0) for spec in specs]
+    seen = [set() for _ in specs]
+    topups = [0] * len(specs)
+    in_flight = {}
+    done = 0
+
+    def dispatch():
+        while pending:
+            index, size = pending[0]
+            spec = specs[index]
+            args = (user_id, generate, spec["topic"], spec["difficulty"], spec["type"], size)
+            avoid = [q["question"] for q in results[index]["questions"]]
+            if in_flight:
+                future = executor.try_submit(*args, avoid=avoid)
+                if future is None:
+                    break
+            else:
+                # Nothing of ours is running (slots held elsewhere); wait for one instead of spinning
+                try:
+                    future = executor.submit(*args, avoid=avoid)
+                except TimeoutError:
+                    # No slot freed up in time: keep what was generated and count the rest as failed
+                    for index, _size in pending:
+                        results[index]["failed_calls"] += 1
+                    pending.clear()
+                    return
+            pending.pop(0)
+            in_flight[future] = index
+
+    dispatch()
+
+    while in_flight:
+        finished, _ = wait(list(in_flight), timeout=timeout or executor.timeout, return_when=FIRST_COMPLETED)
+        if not finished:
+            for future, index in in_flight.items():
+                future.cancel()
+                results[index]["failed_calls"] += 1
+            done += len(in_flight)
+            for index, _size in pending:
+                results[index]["failed_calls"] += 1
+            break
+        for future in finished:
+            index = in_flight.pop(future)
+            result = results[index]
+            failed = future.exception() is not None
+            questions = []
+            for question in [] if failed else (future.result() or []):
+                digest = question_hash(question)
+                if digest not in seen[index]:
+                    seen[index].add(digest)
+                    questions.append(question)
+            if not questions:
+                result["failed_calls"] += 1
+            result["questions"].extend(questions)
+            if bank is not None and questions:
+                bank.add(result["topic"], result["difficulty"], questions)
+            done += 1
+            missing = result["count"] - len(result["questions"])
+            idle = index not in in_flight.values() and all(i != index for i, _size in pending)
+            if missing > 0 and not failed and idle and topups[index] < MAX_TOPUP_CALLS:
+                # Only unique questions count toward the set; ask again for what duplicates took
+                topups[index] += 1
+                pending.append((index, min(missing, MAX_QUESTIONS_PER_CALL)))
+                total += 1
+            if on_result:
+                on_result(result, questions, done, total)
+        dispatch()
+    return results
+
+
+def export_batch(results):
+    return json.dumps({
+        "generated": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "sets": [
+            {"topic": r["topic"], "difficulty": r["difficulty"], "type": r["type"], "questions": r["questions"]}
+            for r in results
+        ]
+    }, indent=2)
@@ -0,0 +1,76 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my no nor not now of off on once only or
+other our out over own same she should so some such than that the their them then there these they this
+those through to too under until up very was we were what when where which while who whom why will with
+you your
+""".split())
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_pages(pages, chunk_words=180, overlap_words=40):
+    # Chunks never cross a page boundary, so every chunk cites exactly one page
+    chunks = []
+    step = max(1, chunk_words - overlap_words)
+    for page in pages:
+        words = page["text"].split()
+        for start in range(0, max(len(words), 1), step):
+            window = words[start:start + chunk_words]
+            if not window:
+                break
+            chunks.append({"page": page["page"], "text": " ".join(window)})
+            if start + chunk_words >= len(words):
+                break
+    return chunks
+
+
+class BM25Index:
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for chunk_id, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["text"]))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((chunk_id, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        n = len(chunks)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    @classmethod
+    def from_pages(cls, pages, **chunk_options):
+        return cls(chunk_pages(pages, **chunk_options))
+
+    def search(self, query, k=5):
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / self.avg_length)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [dict(self.chunks[chunk_id], score=score) for chunk_id, score in ranked]
+
+
+def format_context(chunks):
+    # Retrieved chunks go back into document order so the model reads them as a coherent excerpt
+    ordered = sorted(chunks, key=lambda c: c["page"])
+    return "\n\n".join(f"[Page {c['page']}]\n{c['text']}" for c in ordered)
@@ -0,0 +1,92 @@
+from quiz_bank import difficulty_key
+
+
+def empty_analytics():
+    # Running quiz aggregates for one session; record_attempt() keeps them current in O(1)
+    return {"attempts": 0, "correct": 0, "questions": 0, "topics": {}, "difficulties": {}}
+
+
+BUCKET_FIELDS = ("attempts", "correct", "questions", "mean", "best", "latest")
+
+
+def _empty_bucket():
+    return {"attempts": 0, "correct": 0, "questions": 0, "mean": 0.0, "best": 0.0, "latest": None}
+
+
+def attempt_percentage(attempt):
+    return (attempt["score"] / attempt["total"]) * 100 if attempt["total"] else 0.0
+
+
+def _update_bucket(bucket, score, total, percentage):
+    bucket["attempts"] += 1
+    bucket["correct"] += score
+    bucket["questions"] += total
+    # Mean of per-quiz percentages, updated without revisiting earlier attempts
+    bucket["mean"] += (percentage - bucket["mean"]) / bucket["attempts"]
+    bucket["best"] = max(bucket["best"], percentage)
+    bucket["latest"] = percentage
+
+
+def record_attempt(analytics, attempt, index=None):
+    # index is the attempt's position in quiz_scores, kept per topic so topic views skip the scan
+    score, total = attempt["score"], attempt["total"]
+    percentage = attempt_percentage(attempt)
+    analytics["attempts"] += 1
+    analytics["correct"] += score
+    analytics["questions"] += total
+
+    topic = analytics["topics"].setdefault(attempt["topic"], dict(_empty_bucket(), by_difficulty={}, attempt_indexes=[]))
+    _update_bucket(topic, score, total, percentage)
+    topic["attempt_indexes"].append(analytics["attempts"] - 1 if index is None else index)
+
+    difficulty = attempt.get("difficulty")
+    if difficulty:
+        key = difficulty_key(difficulty)
+        _update_bucket(topic["by_difficulty"].setdefault(key, _empty_bucket()), score, total, percentage)
+        _update_bucket(analytics["difficulties"].setdefault(key, _empty_bucket()), score, total, percentage)
+    return analytics
+
+
+def attempt_buckets(attempt):
+    # (topic, difficulty) keys of the stored aggregates an attempt updates; "" stands for any
+    keys = [("", ""), (attempt["topic"], "")]
+    if attempt.get("difficulty"):
+        difficulty = difficulty_key(attempt["difficulty"])
+        keys += [(attempt["topic"], difficulty), ("", difficulty)]
+    return keys
+
+
+def analytics_from_rows(rows, attempts):
+    # rows: (topic, difficulty, *BUCKET_FIELDS) in insertion order. The per-topic attempt indexes
+    # aren't stored; they are rebuilt from the session's attempts, which are loaded anyway.
+    analytics = empty_analytics()
+    for topic, difficulty, *values in rows:
+        bucket = dict(zip(BUCKET_FIELDS, values))
+        if topic:
+            stats = analytics["topics"].setdefault(topic, dict(_empty_bucket(), by_difficulty={}, attempt_indexes=[]))
+            if difficulty:
+                stats["by_difficulty"][difficulty] = bucket
+            else:
+                stats.update(bucket)
+        elif difficulty:
+            analytics["difficulties"][difficulty] = bucket
+        else:
+            analytics.update({k: bucket[k] for k in ("attempts", "correct", "questions")})
+    for index, attempt in enumerate(attempts):
+        stats = analytics["topics"].get(attempt["topic"])
+        if stats is not None:
+            stats["attempt_indexes"].append(index)
+    return analytics
+
+
+def average_score(analytics):
+    if not analytics["questions"]:
+        return None
+    return analytics["correct"] / analytics["questions"] * 100
+
+
+def topic_attempts(analytics, quiz_scores, topic):
+    stats = analytics["topics"].get(topic)
+    if stats is None:
+        return []
+    return [quiz_scores[i] for i in stats["attempt_indexes"]]
@@ -0,0 +1,277 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from session_analytics import (
+    analytics_from_rows,
+    attempt_buckets,
+    attempt_percentage,
+    empty_analytics
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_user ON sessions (user_id, updated_at);
+
+CREATE TABLE IF NOT EXISTS session_fields (
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (session_id, field)
+);
+
+CREATE TABLE IF NOT EXISTS topics (
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    topic TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    explanation TEXT,
+    resources TEXT,
+    PRIMARY KEY (session_id, topic)
+);
+
+CREATE TABLE IF NOT EXISTS conversations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    topic TEXT,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversations_by_session ON conversations (session_id, kind, topic);
+
+CREATE TABLE IF NOT EXISTS quiz_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    topic TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    difficulty TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quiz_attempts_by_session ON quiz_attempts (session_id);
+
+-- Running quiz aggregates, one row per (topic, difficulty) bucket; "" stands for any
+CREATE TABLE IF NOT EXISTS quiz_stats (
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    topic TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    questions INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    best REAL NOT NULL,
+    latest REAL,
+    PRIMARY KEY (session_id, topic, difficulty)
+);
+"""
+
+# Adds one attempt to a bucket in place; on conflict the right-hand sides see the old row
+UPSERT_STATS = """
+INSERT INTO quiz_stats (session_id, topic, difficulty, attempts, correct, questions, mean, best, latest)
+VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+ON CONFLICT (session_id, topic, difficulty) DO UPDATE SET
+    attempts = attempts + 1,
+    correct = correct + excluded.correct,
+    questions = questions + excluded.questions,
+    mean = mean + (excluded.mean - mean) / (attempts + 1),
+    best = MAX(best, excluded.best),
+    latest = excluded.latest
+"""
+
+# Session keys stored one row each in session_fields; the rest live in their own tables
+FIELD_KEYS = (
+    "learning_path", "topic_performance", "current_study_topic", "quiz_data", "user_answers",
+    "recommended_topics", "pdf_doc_id", "pdf_pages", "pdf_file_id",
+)
+
+
+def empty_session(name, created):
+    return {
+        "name": name,
+        "created": created,
+        "learning_path": [],
+        "quiz_scores": [],
+        "topic_performance": {},
+        "pdf_doc_id": None,
+        "pdf_pages": [],
+        "pdf_file_id": None,
+        "chat_history": [],
+        "current_study_topic": None,
+        "study_conversation": [],
+        "topic_history": {},
+        "quiz_data": None,
+        "user_answers": {},
+        "recommended_topics": [],
+        "analytics": empty_analytics()
+    }
+
+
+class SessionStore:
+    # SQLite in WAL mode so several app processes can share one database file
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _touch(self, conn, session_id):
+        conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (time.time(), session_id))
+
+    def list_sessions(self, user_id):
+        rows = self._conn().execute(
+            "SELECT id, name, created FROM sessions WHERE user_id = ? ORDER BY created, rowid", (user_id,)
+        ).fetchall()
+        return [{"id": r[0], "name": r[1], "created": r[2]} for r in rows]
+
+    def count_sessions(self, user_id):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def create_session(self, session_id, user_id, session):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT INTO sessions (id, user_id, name, created, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, user_id, session["name"], session["created"], time.time()),
+            )
+
+    def delete_session(self, session_id):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def load_session(self, session_id):
+        conn = self._conn()
+        row = conn.execute("SELECT name, created FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        session = empty_session(row[0], row[1])
+
+        for field, value in conn.execute(
+            "SELECT field, value FROM session_fields WHERE session_id = ?", (session_id,)
+        ):
+            if field in FIELD_KEYS:
+                session[field] = json.loads(value)
+        # JSON object keys are strings; quiz answers are keyed by question index
+        session["user_answers"] = {int(k): v for k, v in session["user_answers"].items()}
+
+        for topic, timestamp, explanation, resources in conn.execute(
+            "SELECT topic, timestamp, explanation, resources FROM topics WHERE session_id = ? ORDER BY rowid",
+            (session_id,),
+        ):
+            data = {"timestamp": timestamp, "conversations": [], "quizzes": []}
+            if explanation is not None:
+                data["explanation"] = explanation
+            if resources is not None:
+                data["resources"] = json.loads(resources)
+            session["topic_history"][topic] = data
+
+        for kind, topic, question, answer in conn.execute(
+            "SELECT kind, topic, question, answer FROM conversations WHERE session_id = ? ORDER BY id",
+            (session_id,),
+        ):
+            entry = {"q": question, "a": answer}
+            if kind == "pdf":
+                session["chat_history"].append(entry)
+            elif topic in session["topic_history"]:
+                session["topic_history"][topic]["conversations"].append(entry)
+
+        current_topic = session["current_study_topic"]
+        if current_topic in session["topic_history"]:
+            session["study_conversation"] = session["topic_history"][current_topic]["conversations"]
+
+        for topic, score, total, difficulty in conn.execute(
+            "SELECT topic, score, total, difficulty FROM quiz_attempts WHERE session_id = ? ORDER BY id",
+            (session_id,),
+        ):
+            attempt = {"topic": topic, "score": score, "total": total}
+            if difficulty is not None:
+                attempt["difficulty"] = difficulty
+            session["quiz_scores"].append(attempt)
+        rows = conn.execute(
+            "SELECT topic, difficulty, attempts, correct, questions, mean, best, latest FROM quiz_stats "
+            "WHERE session_id = ? ORDER BY rowid",
+            (session_id,),
+        ).fetchall()
+        session["analytics"] = analytics_from_rows(rows, session["quiz_scores"])
+        return session
+
+    def save_fields(self, session_id, session, fields):
+        # Writes only the named keys, one row each, instead of re-serialising the whole session
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_fields (session_id, field, value) VALUES (?, ?, ?)",
+                [(session_id, field, json.dumps(session[field])) for field in fields],
+            )
+            self._touch(conn, session_id)
+
+    def save_topic(self, session_id, topic, data):
+        resources = data.get("resources")
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT INTO topics (session_id, topic, timestamp, explanation, resources) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id, topic) DO UPDATE SET explanation = excluded.explanation, resources = excluded.resources",
+                (session_id, topic, data["timestamp"], data.get("explanation"),
+                 json.dumps(resources) if resources is not None else None),
+            )
+            self._touch(conn, session_id)
+
+    def add_conversation(self, session_id, kind, topic, question, answer):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT INTO conversations (session_id, kind, topic, question, answer, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, kind, topic, question, answer, time.time()),
+            )
+            self._touch(conn, session_id)
+
+    def add_quiz_attempt(self, session_id, attempt):
+        # The attempt and its aggregate buckets are written together so they can't drift apart;
+        # each bucket is updated in place, so the cost doesn't grow with the number of attempts
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT INTO quiz_attempts (session_id, topic, score, total, difficulty, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, attempt["topic"], attempt["score"], attempt["total"], attempt.get("difficulty"), time.time()),
+            )
+            percentage = attempt_percentage(attempt)
+            conn.executemany(
+                UPSERT_STATS,
+                [(session_id, topic, difficulty, attempt["score"], attempt["total"], percentage, percentage, percentage)
+                 for topic, difficulty in attempt_buckets(attempt)],
+            )
+            self._touch(conn, session_id)
+
+    def live_document_ids(self):
+        rows = self._conn().execute("SELECT DISTINCT value FROM session_fields WHERE field = 'pdf_doc_id'")
+        return {json.loads(value) for (value,) in rows} - {None}
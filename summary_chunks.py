@@ -0,0 +1,78 @@
+import hashlib
+import math
+import os
+
+from prompt_budget import count_tokens
+
+# Chunks close at a "boundary" page once they hold CHUNK_MIN_TOKENS, and always before CHUNK_MAX_TOKENS.
+# Boundaries depend only on a page's own text, so documents that share a run of pages (a new
+# edition, an excerpt) produce the same chunks there and reuse the cached chunk summaries.
+CHUNK_MIN_TOKENS = 600
+CHUNK_MAX_TOKENS = 1500
+BOUNDARY_ONE_IN = 4
+
+
+def summary_timeout():
+    # Seconds allowed for the chunk summaries and merges before the final summary starts
+    return float(os.getenv("SUMMARY_TIMEOUT", "120"))
+
+
+def _is_boundary(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()[0] % BOUNDARY_ONE_IN == 0
+
+
+def _split_page(page, tokens, max_tokens):
+    # A page over the chunk limit is cut into equal word runs, each roughly within the limit
+    words = page["text"].split()
+    pieces = math.ceil(tokens / max_tokens)
+    size = math.ceil(len(words) / pieces)
+    for start in range(0, len(words), size):
+        text = " ".join(words[start:start + size])
+        yield {"page": page["page"], "text": text}, count_tokens(text)
+
+
+def summary_chunks(pages, min_tokens=CHUNK_MIN_TOKENS, max_tokens=CHUNK_MAX_TOKENS):
+    # Returns [{"pages": (first, last), "text"}] in document order; empty pages are skipped
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    def close():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append({"pages": (current[0]["page"], current[-1]["page"]), "text": "\n".join(p["text"] for p in current)})
+        current = []
+        current_tokens = 0
+
+    for page in pages:
+        if not page["text"].strip():
+            continue
+        tokens = count_tokens(page["text"])
+        parts = _split_page(page, tokens, max_tokens) if tokens > max_tokens else [(page, tokens)]
+        for part, part_tokens in parts:
+            if current and current_tokens + part_tokens > max_tokens:
+                close()
+            current.append(part)
+            current_tokens += part_tokens
+            if current_tokens >= min_tokens and _is_boundary(part["text"]):
+                close()
+    close()
+    return chunks
+
+
+def spread_order(count):
+    # Indexes 0..count-1 ordered so that every prefix is spread across the whole range
+    # (0, 8, 4, 12, 2, 6, ...): work started in this order and cut short by a timeout leaves
+    # small gaps throughout the document instead of skipping its end.
+    step = 1
+    while step < count:
+        step *= 2
+    order = []
+    seen = set()
+    while step >= 1:
+        for index in range(0, count, step):
+            if index not in seen:
+                seen.add(index)
+                order.append(index)
+        step //= 2
+    return order
@@ -0,0 +1,39 @@
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+ADMIN_TOKEN = "instructor-token"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # A fresh service per test: empty stores in tmp_path and the replay LLM backend (no Groq calls)
+    monkeypatch.setenv("SESSION_DB", str(tmp_path / "sessions.db"))
+    monkeypatch.setenv("DOCUMENT_DIR", str(tmp_path / "documents"))
+    monkeypatch.setenv("LLM_CACHE_DB", "")
+    monkeypatch.setenv("LLM_BACKEND", "replay")
+    monkeypatch.setenv("ADMIN_TOKEN", ADMIN_TOKEN)
+    import api
+    api = importlib.reload(api)
+    yield TestClient(api.app)
+    api.service.llm_executor.shutdown()
+
+
+def test_cohort_requires_admin_token(client):
+    assert client.get("/cohort").status_code == 403
+    assert client.get("/cohort", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_cohort_on_empty_store(client):
+    response = client.get("/cohort", headers={"X-Admin-Token": ADMIN_TOKEN})
+    assert response.status_code == 200
+    report = response.json()
+    assert report["summary"]["attempts"] == 0
+    assert report["weakest_topics"] == []
+    assert report["score_histogram"] == [0] * 10
+
+
+def test_study_history_turns_are_validated(client):
+    body = {"topic": "PCR", "question": "What is annealing?", "history": [{"question": "What is PCR?", "answer": "A method"}]}
+    assert client.post("/study/ask", json=body).status_code == 422
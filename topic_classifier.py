@@ -0,0 +1,106 @@
+import re
+import threading
+from collections import OrderedDict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Whole words specific enough to mark a topic as biotechnology on their own. Words that are
+# common outside biology too (cell, gene, virus, stem, tissue, promoter, protein, nucleus, clone,
+# mutation, molecular, sequencing, hormone, yeast) are left out on purpose: topics built on them
+# go to the LLM check instead of being accepted here.
+BIOTECH_TERMS = frozenset((
+    "agrobacterium", "allele", "amino", "antibiotic", "antibody", "antibodies", "antigen", "apoptosis",
+    "bacteria", "bacterium", "bacterial", "bacteriophage", "biochemistry", "biochemical", "bioengineering",
+    "biofilm", "biofuel", "bioinformatics", "biology", "biological", "biomass", "biomaterial", "biomedical",
+    "biopharmaceutical", "biophysics", "bioprocess", "bioprocessing", "bioreactor", "bioremediation",
+    "biosensor", "biosynthesis", "biotech", "biotechnology", "blotting", "cas9", "cas12", "cas13",
+    "chromatin", "chromatography", "chromosome", "crispr", "cytokine", "cytology", "cytoplasm", "dna",
+    "ecoli", "elisa", "electrophoresis", "embryo", "embryonic", "enzyme", "enzymatic", "epigenetic",
+    "epigenetics", "eukaryote", "eukaryotic", "exon", "fermentation", "genetic", "genetics", "genome",
+    "genomic", "genomics", "genotype", "gmo", "heredity", "histology", "hybridoma", "immune", "immunity",
+    "immunology", "insulin", "intron", "ligase", "lipid", "meiosis", "metabolic", "metabolism", "microbe",
+    "microbial", "microbiology", "microorganism", "mitochondria", "mitochondrial", "mitosis",
+    "monoclonal", "mrna", "mutagenesis", "nuclease", "nucleic", "nucleotide", "oligonucleotide",
+    "organelle", "pathogen", "pcr", "peptide", "phage", "pharmacogenomics", "phenotype",
+    "photosynthesis", "plasmid", "polymerase", "prokaryote", "prokaryotic", "proteome", "proteomics",
+    "recombinant", "ribosome", "rna", "rnai", "sirna", "transcriptome", "transcriptomics", "transfection",
+    "transgene", "transgenic", "vaccination", "vaccine", "virology",
+))
+
+# Whole words that clearly point somewhere else
+OFF_TOPIC_TERMS = frozenset((
+    "actor", "algebra", "anime", "basketball", "bitcoin", "calculus", "celebrity", "celebrities", "cricket",
+    "crypto", "cryptocurrency", "css", "election", "fashion", "film", "football", "geometry", "guitar",
+    "html", "javascript", "marketing", "movie", "music", "novel", "poem", "poetry", "politics",
+    "political", "recipe", "restaurant", "soccer", "song", "sport", "stock", "tennis", "travel",
+    "trigonometry", "videogame", "weather",
+))
+
+YES_NO_RE = re.compile(r"\b(yes|no)\b")
+
+
+def _in_terms(token, terms):
+    # Whole-word match, allowing a plain plural ("plasmids", "vaccines")
+    return token in terms or (token.endswith("s") and token[:-1] in terms)
+
+
+def classify_topic(topic):
+    # Returns True/False for clear cases and None when only an LLM can decide
+    tokens = TOKEN_RE.findall(topic.lower())
+    if not tokens:
+        return False
+    biotech_hits = sum(1 for t in tokens if _in_terms(t, BIOTECH_TERMS))
+    off_topic_hits = sum(1 for t in tokens if _in_terms(t, OFF_TOPIC_TERMS))
+    if biotech_hits and not off_topic_hits:
+        return True
+    if off_topic_hits and not biotech_hits:
+        return False
+    return None
+
+
+def parse_yes_no(response):
+    # Looks at whole words only, so "not" or "know" can no longer read as "no"
+    match = YES_NO_RE.search(response.strip().lower())
+    if match is None:
+        return None
+    return match.group(1) == "yes"
+
+
+class TopicValidator:
+    # Remembers each verdict per normalised topic; the LLM only sees ambiguous topics once
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_decisions = 0
+        self.llm_decisions = 0
+
+    def _remember(self, key, verdict):
+        with self._lock:
+            self._verdicts[key] = verdict
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+
+    def is_biotech(self, topic, ask_llm=None):
+        key = " ".join(topic.lower().split())
+        with self._lock:
+            if key in self._verdicts:
+                self._verdicts.move_to_end(key)
+                return self._verdicts[key]
+
+        verdict = classify_topic(key)
+        if verdict is not None:
+            with self._lock:
+                self.local_decisions += 1
+        elif ask_llm is not None:
+            verdict = parse_yes_no(ask_llm(topic))
+            with self._lock:
+                self.llm_decisions += 1
+            if verdict is None:
+                # An unreadable reply is not a rejection; keep the user moving
+                verdict = True
+        else:
+            verdict = True
+        self._remember(key, verdict)
+        return verdict
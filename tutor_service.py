@@ -0,0 +1,738 @@
+import os
+import time
+from datetime import datetime
+from itertools import chain
+
+from cohort_analytics import CohortAnalytics
+from document_store import DocumentStore
+from llm_cache import ResponseCache, make_cache_key
+from llm_client import LLMClient, LLMUnavailableError
+from llm_executor import LLMExecutor
+from llm_json import (
+    QUESTION_TYPES,
+    JSONArrayStream,
+    extract_json_object,
+    validate_items,
+    validate_question,
+    validate_resource
+)
+from llm_metrics import LLMMetrics, OTLPSpanExporter, take_queue_time
+from llm_routing import FALLBACK_QUEUE_TIMEOUT, FALLBACK_RETRIES, ModelRouter, load_routes
+from llm_replay import REPLAY_CALLS, RecordingLLMClient, ReplayLLMClient, estimate_tokens, load_recordings
+from pdf_ingest import default_workers, file_digest, ingest_pdf
+from prompt_budget import ItemSection, TextSection, fit_prompt
+from quiz_bank import QuizBank, difficulty_key
+from retrieval import BM25Index, format_context
+from session_store import SessionStore
+from summary_chunks import spread_order, summary_chunks, summary_timeout
+from topic_classifier import TopicValidator
+
+RETRIEVAL_TOP_K = 6
+TUTOR_SYSTEM_MSG = "You are a biotechnology expert tutor."
+
+QUIZ_TYPES = {"Multiple Choice": "mcq", "True/False": "tf", "Fill in the Blank": "fill", "Mixed": "mixed"}
+
+QUIZ_INSTRUCTIONS = {
+    "easy": "Focus on basic definitions, simple facts, and foundational concepts.",
+    "intermediate": "Focus on conceptual understanding, mechanisms, and applications.",
+    "hard": "Focus on advanced concepts, analytical scenarios, and higher-order thinking."
+}
+
+QUIZ_EXAMPLES = {
+    "mcq": """    {
+      "type": "mcq",
+      "question": "Question text?",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "correct": 0,
+      "explanation": "Brief explanation"
+    }""",
+    "tf": """    {
+      "type": "tf",
+      "question": "Statement here",
+      "correct": "True",
+      "explanation": "Brief explanation"
+    }""",
+    "fill": """    {
+      "type": "fill",
+      "question": "Question with _____ blank",
+      "correct": "answer",
+      "explanation": "Brief explanation"
+    }"""
+}
+
+QUIZ_KINDS = {"mcq": "multiple-choice", "tf": "true/false", "fill": "fill-in-the-blank", "mixed": "mixed (MCQ, True/False, Fill-in-blank)"}
+
+# Questions generated per background refill; larger batches amortise the prompt
+QUIZ_BANK_BATCH = 10
+
+# Section summaries merged per reduce call
+SUMMARY_REDUCE_FANOUT = 8
+# Share of SUMMARY_TIMEOUT given to the chunk summaries; the reduce levels get the rest
+SUMMARY_MAP_SHARE = 0.7
+
+
+def avoid_questions_note(questions):
+    if not questions:
+        return ""
+    return "\n\nDo not repeat any of these questions:\n" + "\n".join(f"- {q}" for q in questions)
+
+
+def quiz_qtypes(qtype):
+    return list(QUESTION_TYPES) if qtype == "mixed" else [qtype]
+
+
+def build_quiz_prompt(topic, difficulty, qtype, count):
+    examples = ",\n".join(QUIZ_EXAMPLES.values()) if qtype == "mixed" else QUIZ_EXAMPLES[qtype]
+    return f"""Generate a {difficulty} difficulty quiz on '{topic}' with {count} {QUIZ_KINDS[qtype]} questions.
+{QUIZ_INSTRUCTIONS.get(difficulty_key(difficulty), "")}
+
+Return ONLY valid JSON:
+{{
+  "questions": [
+{examples}
+  ]
+}}
+
+Make sure questions are DIFFERENT from other difficulty levels and appropriate for {difficulty} level."""
+
+
+def parse_grounded_answer(response, retrieved):
+    # Expected shape: {"covered": bool, "answer": str, "pages": [int]}
+    # Cited pages are limited to the retrieved excerpts so the model cannot invent page numbers
+    retrieved_pages = sorted({c["page"] for c in retrieved})
+    payload = extract_json_object(response)
+    if payload is None:
+        # Plain-text fallback: keep the generation rather than discarding it
+        return {"covered": True, "answer": response.strip(), "pages": retrieved_pages}
+
+    # An object that doesn't match the schema is never shown as raw JSON: a usable "answer"
+    # is kept, anything else is treated as not covered
+    answer = payload.get("answer")
+    answer = answer if isinstance(answer, str) else ""
+    covered = payload.get("covered")
+    covered = covered if isinstance(covered, bool) else bool(answer.strip())
+    pages = payload.get("pages")
+    pages = pages if isinstance(pages, list) else []
+    if covered and not answer.strip():
+        covered = False
+    cited = sorted({p for p in pages if isinstance(p, int) and p in retrieved_pages})
+    return {"covered": covered, "answer": answer, "pages": cited or retrieved_pages}
+
+
+def normalize_answer(q, answer):
+    # MCQ answers are option indexes, True/False answers "True"/"False", fill-ins compared case-insensitively
+    if answer is None:
+        return None
+    q_type = q.get("type", "mcq")
+    if q_type == "mcq":
+        if isinstance(answer, str) and answer.isdigit():
+            answer = int(answer)
+        return answer if isinstance(answer, int) and not isinstance(answer, bool) else None
+    if q_type == "tf":
+        if isinstance(answer, bool):
+            return "True" if answer else "False"
+        return str(answer).strip().capitalize()
+    return str(answer).strip().lower()
+
+
+def correct_answer_text(q):
+    if q.get("type", "mcq") == "mcq":
+        return q["options"][q["correct"]]
+    return q["correct"]
+
+
+def score_quiz(questions, answers):
+    # answers: {question index: answer} or a list in question order
+    if isinstance(answers, list):
+        answers = dict(enumerate(answers))
+    results = []
+    for i, q in enumerate(questions):
+        given = normalize_answer(q, answers.get(i))
+        expected = q["correct"].lower() if q.get("type", "mcq") == "fill" else q["correct"]
+        results.append({
+            "correct": given is not None and given == expected,
+            "answer": correct_answer_text(q),
+            "explanation": q.get("explanation", "")
+        })
+    score = sum(1 for r in results if r["correct"])
+    total = len(questions)
+    return {
+        "score": score,
+        "total": total,
+        "percentage": (score / total) * 100 if total else 0,
+        "results": results
+    }
+
+
+def summary_prompt(document):
+    return f"""Summarize this biotechnology document. Include:
+1. Main topics covered
+2. Key concepts
+3. Document structure
+
+Document content:
+{document}
+
+Provide a clear, organized summary for study purposes."""
+
+
+def document_answer_prompt(question, context):
+    return f"""Answer this question using ONLY information from the document excerpts below. Do not use external knowledge.
+
+Question: {question}
+
+Document excerpts (each starts with its page number):
+{context}
+
+Return ONLY valid JSON:
+{{
+  "covered": true,
+  "answer": "Clear, student-friendly explanation based strictly on the excerpts. Mention when information came from the document.",
+  "pages": [1, 2]
+}}
+Set "covered" to false and "answer" to "" if the excerpts do not contain the answer. "pages" lists the page numbers of the excerpts you used."""
+
+
+def chunk_summary_prompt(chunk):
+    # No page numbers or document names: the prompt is the chunk's content alone, so its cached
+    # summary is reused wherever the same text appears
+    return f"""Summarize this excerpt from a biotechnology document in at most 120 words.
+Keep the key concepts, definitions, methods and findings; skip examples and references.
+
+Excerpt:
+{chunk}"""
+
+
+def merge_summaries_prompt(sections):
+    return f"""These are summaries of consecutive parts of a biotechnology document, in order.
+Combine them into one summary of at most 200 words that keeps the main topics, key concepts and the order they appear in.
+
+{sections}"""
+
+
+def final_summary_prompt(sections):
+    return f"""Summarize this biotechnology document from the summaries of its parts below (in document order). Include:
+1. Main topics covered
+2. Key concepts
+3. Document structure
+
+Part summaries:
+{sections}
+
+Provide a clear, organized summary for study purposes."""
+
+
+def render_section(section):
+    first, last = section["pages"]
+    return f"[Pages {first}-{last}]\n{section['summary']}" if first != last else f"[Page {first}]\n{section['summary']}"
+
+
+def explain_prompt(topic):
+    return f"""Provide a comprehensive, detailed explanation of '{topic}' STRICTLY from a biotechnology perspective.
+
+Include:
+1. **Introduction**: What is {topic}? (2-3 paragraphs)
+2. **Key Concepts**: Main principles and mechanisms (4-5 points with details)
+3. **Biological Significance**: Why is this important in biotechnology?
+4. **Real-World Applications**: Practical uses and examples in biotechnology (3-4 applications)
+5. **Current Research**: Recent developments or future directions in biotechnology
+6. **Common Misconceptions**: What students often get wrong
+
+IMPORTANT: Focus ONLY on biotechnology aspects. Do not drift into unrelated subjects. Make it detailed, student-friendly, and comprehensive for deep learning."""
+
+
+def study_answer_prompt(topic, question, history):
+    return f"""You are teaching about '{topic}' in biotechnology.
+
+Previous conversation:
+{history}
+
+Student question: {question}
+
+Provide a clear, student-friendly answer focused STRICTLY on biotechnology aspects. Assume the question is about the current topic unless specified otherwise. Do not provide general-purpose answers unrelated to biotechnology."""
+
+
+def suggestions_prompt(topics):
+    return f"""Based on these biotechnology topics studied in order: {topics}
+
+Suggest 3-5 logically connected next topics based on prerequisite relationships and natural progression.
+
+Return as a simple numbered list (e.g., 1. Topic Name).
+
+Ensure suggestions are:
+- Directly related to studied topics
+- Follow logical prerequisites
+- Progress in complexity
+- Avoid generic unrelated topics"""
+
+
+def feedback_prompt(learning_path, quiz_scores):
+    return f"""Analyze this student's biotechnology learning data:
+Learning path: {learning_path}
+Quiz scores:
+{quiz_scores}
+
+Provide:
+1. Strengths (2-3 points)
+2. Areas for improvement (2-3 points)
+3. Specific recommendations (3 actionable tips)"""
+
+
+def usage_tokens(usage, messages, text):
+    # Groq reports usage on responses and on the last stream chunk; estimate when it is missing
+    if usage is not None:
+        return usage.prompt_tokens, usage.completion_tokens
+    return sum(estimate_tokens(m["content"]) for m in messages), estimate_tokens(text)
+
+
+def chunk_usage(chunk):
+    # OpenAI-style streams put it on the chunk, Groq under x_groq
+    return getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+
+
+def render_turn(turn):
+    return f"Q: {turn['q']}\nA: {turn['a']}"
+
+
+def render_chunk(chunk):
+    return f"[Page {chunk['page']}]\n{chunk['text']}"
+
+
+def summarize_turns(turns):
+    # Older turns that don't fit are reduced to the questions asked
+    return "Earlier questions: " + "; ".join(turn["q"] for turn in turns)
+
+
+def summarize_attempts(attempts):
+    scored = [a for a in attempts if isinstance(a.get("score"), (int, float)) and isinstance(a.get("total"), (int, float)) and a["total"]]
+    summary = f"{len(attempts)} earlier quiz attempt(s)"
+    if scored:
+        summary += f", averaging {sum(a['score'] / a['total'] for a in scored) / len(scored) * 100:.0f}%"
+    return summary
+
+
+def new_topic_entry():
+    return {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"), "conversations": [], "quizzes": []}
+
+
+class TutorService:
+    # The tutor features without any UI: the Streamlit app and the HTTP API both call this.
+    # Every component is thread-safe and meant to be shared by all users of a process.
+    def __init__(self, client, llm_cache, llm_executor, topic_validator, document_store, session_store, quiz_bank, cohort_analytics, metrics, router):
+        self.client = client
+        self.llm_cache = llm_cache
+        self.llm_executor = llm_executor
+        self.topic_validator = topic_validator
+        self.document_store = document_store
+        self.session_store = session_store
+        self.quiz_bank = quiz_bank
+        self.cohort_analytics = cohort_analytics
+        self.metrics = metrics
+        self.router = router
+
+    def request_completion(self, task, messages, site, json_mode=False, stream=False):
+        # Tries the task's models in order and returns (model, response, started, clock) for the
+        # one that answered. A rate-limited or unavailable model is cooled down in the router and
+        # the next one is tried; every model but the last gets only a short wait and one retry.
+        route = self.router.routes[task]
+        candidates = self.router.candidates(task)
+        for i, model in enumerate(candidates):
+            options = {"response_format": {"type": "json_object"}} if json_mode else {}
+            if stream:
+                options["stream"] = True
+            if i < len(candidates) - 1:
+                options.update(max_retries=FALLBACK_RETRIES, queue_timeout=FALLBACK_QUEUE_TIMEOUT)
+            started = time.time()
+            clock = time.perf_counter()
+            try:
+                response = self.client.create_chat_completion(
+                    model=model, messages=messages, max_tokens=route["max_tokens"], temperature=route["temperature"], **options
+                )
+            except LLMUnavailableError:
+                self.metrics.record(site, model, "error", started, time.perf_counter() - clock, queue=take_queue_time())
+                self.router.mark_unavailable(model)
+                if i == len(candidates) - 1:
+                    raise
+                continue
+            except Exception:
+                self.metrics.record(site, model, "error", started, time.perf_counter() - clock, queue=take_queue_time())
+                raise
+            self.router.mark_available(model)
+            return model, response, started, clock
+
+    def response_cache_key(self, task, system_msg, prompt, json_mode=False):
+        # Keyed on the primary model and its settings; fallback answers are not cached, so the
+        # better model answers again as soon as it is back
+        route = self.router.routes[task]
+        params = {"max_tokens": route["max_tokens"], "temperature": route["temperature"]}
+        if json_mode:
+            params["response_format"] = {"type": "json_object"}
+        return make_cache_key(route["models"][0], system_msg, prompt, params)
+
+    # task is the routing class (see llm_routing.DEFAULT_ROUTES); site labels the calling feature in metrics
+    def call_llm(self, prompt, system_msg=TUTOR_SYSTEM_MSG, use_cache=True, json_mode=False, task="generate-long", site="other"):
+        cache_key = self.response_cache_key(task, system_msg, prompt, json_mode)
+        if use_cache:
+            started = time.time()
+            clock = time.perf_counter()
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record(site, self.router.primary(task), "cache_hit", started, time.perf_counter() - clock, queue=take_queue_time())
+                return cached
+
+        messages = [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": prompt}
+        ]
+        model, response, started, clock = self.request_completion(task, messages, site, json_mode=json_mode)
+        latency = time.perf_counter() - clock
+        content = response.choices[0].message.content
+        prompt_tokens, completion_tokens = usage_tokens(getattr(response, "usage", None), messages, content)
+        self.metrics.record(
+            site, model, "ok", started, latency, ttft=latency, queue=take_queue_time(),
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        )
+        if use_cache and model == self.router.primary(task):
+            self.llm_cache.set(cache_key, content)
+        return content
+
+    def call_llm_stream(self, prompt, system_msg=TUTOR_SYSTEM_MSG, use_cache=True, task="generate-long", site="other"):
+        # Yields text as tokens arrive; the full text is cached only if the stream completes.
+        # Fallback to another model is only possible before the first token.
+        cache_key = self.response_cache_key(task, system_msg, prompt)
+        if use_cache:
+            started = time.time()
+            clock = time.perf_counter()
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record(site, self.router.primary(task), "cache_hit", started, time.perf_counter() - clock, queue=take_queue_time())
+                yield cached
+                return
+
+        messages = [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": prompt}
+        ]
+        model, stream, started, clock = self.request_completion(task, messages, site, stream=True)
+        queue = take_queue_time()
+        parts = []
+        usage = None
+        ttft = None
+        outcome = "cancelled"
+        try:
+            for chunk in stream:
+                usage = chunk_usage(chunk) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if ttft is None:
+                        ttft = time.perf_counter() - clock
+                    parts.append(delta)
+                    yield delta
+            outcome = "ok"
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            # A rerun or stop mid-stream closes this generator; drop the connection instead of draining it
+            if outcome != "ok":
+                stream.close()
+            prompt_tokens, completion_tokens = usage_tokens(usage, messages, "".join(parts))
+            self.metrics.record(
+                site, model, outcome, started, time.perf_counter() - clock, ttft=ttft, queue=queue,
+                prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+            )
+        if use_cache and model == self.router.primary(task):
+            self.llm_cache.set(cache_key, "".join(parts))
+
+    def generate_text(self, prompt, system_msg=TUTOR_SYSTEM_MSG, stream=False, site="other", task="generate-long"):
+        # The UI streams into the page; API callers get the whole text
+        if stream:
+            return self.call_llm_stream(prompt, system_msg, task=task, site=site)
+        return self.call_llm(prompt, system_msg, task=task, site=site)
+
+    def budget_prompt(self, site, render, sections, system_msg=TUTOR_SYSTEM_MSG, task="generate-long"):
+        # Fits the sections into the site's PROMPT_BUDGETS; what had to be cut shows up in metrics
+        prompt, dropped = fit_prompt(site, self.router.primary(task), system_msg, render, sections)
+        self.metrics.record_trim(site, dropped)
+        return prompt
+
+    def ask_topic_llm(self, topic):
+        # Only topics the local vocabulary can't decide get here, and they go to the classify route's small model
+        prompt = f"""Is '{topic}' a topic related to biotechnology?
+
+Biotechnology includes: molecular biology, genetics, cell biology, microbiology, bioengineering, biochemistry, genetic engineering, biomedical applications, agricultural biotechnology, industrial biotechnology.
+
+Answer ONLY 'yes' or 'no'."""
+        return self.call_llm(prompt, "You are a biotechnology topic classifier. Answer only 'yes' or 'no'.", task="classify", site="topic_check")
+
+    def is_biotech_related(self, query):
+        return self.topic_validator.is_biotech(query, self.ask_topic_llm)
+
+    def fetch_learning_resources(self, topic, refresh=False):
+        resource_prompt = f"""For the biotechnology topic '{topic}', suggest 5 high-quality learning resources.
+Return ONLY valid JSON:
+{{
+  "resources": [
+    {{"title": "Resource name", "url": "https://example.com", "description": "Brief description", "type": "Website/Video/Article"}}
+  ]
+}}
+Use reputable sources: Khan Academy, Nature Education, NCBI, MIT OCW, university websites, YouTube lectures."""
+        payload = extract_json_object(self.call_llm(resource_prompt, use_cache=not refresh, json_mode=True, task="generate-json", site="resources")) or {}
+        items = payload.get("resources")
+        resources, _broken = validate_items(items if isinstance(items, list) else [], validate_resource)
+        return resources or None
+
+    def ingest_document(self, data, progress=None):
+        # Returns (doc_id, page offsets, failed pages); the text itself stays in the shared document store.
+        # Raises UnreadablePdfError when the file can't be parsed at all.
+        doc_id = file_digest(data)
+        failed_pages = []
+        if not self.document_store.exists(doc_id):
+            document = ingest_pdf(data, progress=progress, workers=default_workers(), doc_id=doc_id)
+            self.document_store.put(doc_id, document["pages"])
+            failed_pages = sorted(document["failed_pages"])
+        return doc_id, self.document_store.meta(doc_id)["pages"], failed_pages
+
+    def document_index(self, doc_id, page_offsets=None):
+        return self.document_store.derived(
+            doc_id, "bm25", lambda: BM25Index.from_pages(self.document_store.pages(doc_id, page_offsets))
+        )
+
+    def summary_chunks(self, doc_id):
+        return self.document_store.derived(doc_id, "summary_chunks", lambda: summary_chunks(self.document_store.pages(doc_id)))
+
+    def summarize_chunk(self, text):
+        # Cached like every call_llm response, keyed by a hash of the prompt, i.e. of the chunk's text
+        prompt = self.budget_prompt("summary_map", chunk_summary_prompt, [TextSection("chunk", text)], task="extract")
+        return self.call_llm(prompt, task="extract", site="summary_map")
+
+    def merge_summaries(self, sections):
+        prompt = self.budget_prompt("summary_reduce", merge_summaries_prompt, [ItemSection("sections", sections, render_section)], task="extract")
+        return self.call_llm(prompt, task="extract", site="summary_reduce")
+
+    def summarize_document(self, doc_id, stream=False, user_id="anonymous", progress=None):
+        # Map-reduce: chunk summaries run in parallel within the user's executor slots and the
+        # shared rate limiter, then are merged SUMMARY_REDUCE_FANOUT at a time until one final
+        # (streamed) call remains. Every chunk is summarized; the time is bounded by SUMMARY_TIMEOUT,
+        # and chunks still unfinished then are left out (spread across the document, see spread_order).
+        # progress(done, total) reports the chunk summaries.
+        chunks = self.summary_chunks(doc_id)
+        if not chunks:
+            # Scanned or unreadable PDFs: without text the model could only invent a summary
+            note = "_This document has no extractable text to summarize._"
+            return iter([note]) if stream else note
+        if len(chunks) == 1:
+            # Short documents fit a single prompt
+            document = chunks[0]["text"]
+            prompt = self.budget_prompt("document_summary", summary_prompt, [TextSection("document", document)])
+            return self.generate_text(prompt, stream=stream, site="document_summary")
+
+        timeout = summary_timeout()
+        deadline = time.monotonic() + timeout
+        order = spread_order(len(chunks))
+        summaries = self.llm_executor.map_within(
+            user_id, self.summarize_chunk, [chunks[i]["text"] for i in order], timeout * SUMMARY_MAP_SHARE, progress
+        )
+        # "chunks" counts the chunk summaries folded into each section; sections are in document order
+        sections = [
+            {"pages": chunks[index]["pages"], "summary": summary, "chunks": 1}
+            for index, summary in sorted(zip(order, summaries), key=lambda pair: pair[0])
+            if isinstance(summary, str) and summary.strip()
+        ]
+        if not sections:
+            errors = [s for s in summaries if isinstance(s, LLMUnavailableError)]
+            raise errors[0] if errors else LLMUnavailableError("The document could not be summarized right now. Please try again in a moment.")
+
+        while len(sections) > SUMMARY_REDUCE_FANOUT:
+            groups = [sections[i:i + SUMMARY_REDUCE_FANOUT] for i in range(0, len(sections), SUMMARY_REDUCE_FANOUT)]
+            merged = self.llm_executor.map_within(user_id, self.merge_summaries, groups, max(0.0, deadline - time.monotonic()))
+            # A group whose merge failed or ran out of time keeps only its first section, so every level shrinks
+            sections = [
+                {"pages": (group[0]["pages"][0], group[-1]["pages"][1]), "summary": summary, "chunks": sum(s["chunks"] for s in group)}
+                if isinstance(summary, str) else group[0]
+                for group, summary in zip(groups, merged)
+            ]
+
+        prompt = self.budget_prompt("document_summary", final_summary_prompt, [ItemSection("sections", sections, render_section)])
+        summary = self.generate_text(prompt, stream=stream, site="document_summary")
+        covered = sum(s["chunks"] for s in sections)
+        if covered == len(chunks):
+            return summary
+        self.metrics.record_trim("document_summary", [{"section": "chunks", "items": len(chunks) - covered, "tokens": 0}])
+        note = f"_Based on {covered} of {len(chunks)} sections of the document; the rest did not finish within the time limit._\n\n"
+        return chain([note], summary) if stream else note + summary
+
+    def answer_from_document(self, doc_id, question, page_offsets=None):
+        # Only the best-matching chunks are sent, so prompt size no longer grows with the document
+        retrieved = self.document_index(doc_id, page_offsets).search(question, k=RETRIEVAL_TOP_K)
+        if not retrieved:
+            return {"covered": False, "answer": "", "pages": []}
+        # One structured call decides coverage and answers; citations come from retrieval metadata.
+        # Excerpts are kept in rank order until the context budget is spent.
+        system_msg = "You are a tutor. Answer ONLY using the provided document. Do not add external information. Respond in JSON."
+        context = ItemSection("context", retrieved, render_chunk, join=format_context)
+        prompt = self.budget_prompt("document_answer", document_answer_prompt, [TextSection("question", question), context], system_msg, "generate-json")
+        response = self.call_llm(prompt, system_msg, json_mode=True, task="generate-json", site="document_answer")
+        return parse_grounded_answer(response, context.kept)
+
+    def explain_topic(self, topic, stream=False):
+        return self.generate_text(explain_prompt(topic), "You are a biotechnology expert. Explain ONLY biotechnology-related aspects.", stream, "explanation")
+
+    def answer_study_question(self, topic, question, history, stream=False):
+        # The most recent turns are kept verbatim; older ones are reduced to their questions
+        system_msg = "You are a biotechnology tutor. Answer ONLY biotechnology-related questions."
+        prompt = self.budget_prompt(
+            "study_answer",
+            lambda question, history: study_answer_prompt(topic, question, history),
+            [TextSection("question", question), ItemSection("history", history, render_turn, keep="tail", summarize=summarize_turns)],
+            system_msg
+        )
+        return self.generate_text(prompt, system_msg, stream, "study_answer")
+
+    def suggest_topics(self, studied_topics, stream=False):
+        system_msg = "You are a biotechnology curriculum expert."
+        topics = ItemSection(
+            "topics", studied_topics, str, keep="tail", join=", ".join,
+            summarize=lambda dropped: f"({len(dropped)} earlier topics omitted)"
+        )
+        prompt = self.budget_prompt("suggestions", suggestions_prompt, [topics], system_msg)
+        return self.generate_text(prompt, system_msg, stream, "suggestions")
+
+    def feedback(self, learning_path, quiz_scores, stream=False):
+        # Recent attempts are listed one per line; older ones are folded into a count and average
+        sections = [
+            ItemSection("quiz_scores", quiz_scores, str, keep="tail", summarize=summarize_attempts),
+            ItemSection("learning_path", learning_path, str, keep="tail", join=lambda items: ", ".join(map(str, items)),
+                        summarize=lambda dropped: f"({len(dropped)} earlier steps omitted)")
+        ]
+        prompt = self.budget_prompt("feedback", feedback_prompt, sections)
+        return self.generate_text(prompt, stream=stream, site="feedback")
+
+    def cohort_report(self, weakest=10):
+        self.cohort_analytics.refresh()
+        weakest_topics = self.cohort_analytics.weakest_topics(weakest)
+        return {
+            "summary": self.cohort_analytics.summary(),
+            "weakest_topics": [
+                {"topic": topic, "attempts": int(row["attempts"]), "mean": float(row["mean"])}
+                for topic, row in weakest_topics.iterrows()
+            ],
+            "score_histogram": self.cohort_analytics.score_histogram().tolist()
+        }
+
+    def collect_quiz_questions(self, prompt, stream=False, on_question=None, site="quiz"):
+        # Streaming parses questions as they arrive so each can be shown immediately;
+        # otherwise Groq's JSON mode is used (it can't be combined with streaming)
+        if stream:
+            parser = JSONArrayStream("questions")
+            items = (item for chunk in self.call_llm_stream(prompt, use_cache=False, task="generate-json", site=site) for item in parser.feed(chunk))
+        else:
+            payload = extract_json_object(self.call_llm(prompt, use_cache=False, json_mode=True, task="generate-json", site=site)) or {}
+            items = payload.get("questions")
+            items = items if isinstance(items, list) else []
+        questions = []
+        for item in items:
+            question = validate_question(item)
+            if question is not None:
+                questions.append(question)
+                if on_question:
+                    on_question(question)
+        return questions
+
+    def generate_quiz_questions(self, topic, difficulty, qtype, count, stream=False, on_question=None, site="quiz", avoid=()):
+        # avoid: question stems generated earlier for the same quiz (batch calls), not to be repeated
+        prompt = build_quiz_prompt(topic, difficulty, qtype, count) + avoid_questions_note(avoid)
+        questions = self.collect_quiz_questions(prompt, stream, on_question, site)
+        missing = count - len(questions)
+        if missing > 0:
+            # Regenerate only the broken or truncated items and keep the valid ones
+            prompt = build_quiz_prompt(topic, difficulty, qtype, missing) + avoid_questions_note([*avoid, *(q["question"] for q in questions)])
+            seen = {q["question"] for q in questions}
+            for question in self.collect_quiz_questions(prompt, stream, on_question, site):
+                if question["question"] not in seen:
+                    questions.append(question)
+        return questions[:count]
+
+    def banked_quiz(self, user_id, topic, difficulty, qtype, count):
+        # None unless the bank has enough questions this user hasn't seen
+        return self.quiz_bank.sample(topic, difficulty, quiz_qtypes(qtype), count, user_id)
+
+    def create_quiz(self, user_id, topic, difficulty, qtype, count, stream=False, on_question=None):
+        questions = self.generate_quiz_questions(topic, difficulty, qtype, count, stream, on_question)
+        if questions:
+            self.quiz_bank.mark_seen(user_id, self.quiz_bank.add(topic, difficulty, questions))
+        return questions
+
+    def serve_quiz(self, user_id, topic, difficulty, qtype, count):
+        # Instant when the bank has enough unseen questions; otherwise generate live and bank the result
+        questions = self.banked_quiz(user_id, topic, difficulty, qtype, count)
+        if questions is None:
+            questions = self.create_quiz(user_id, topic, difficulty, qtype, count)
+        self.schedule_quiz_refill(topic, difficulty, qtype)
+        return questions
+
+    def schedule_quiz_refill(self, topic, difficulty, qtype):
+        for refill_type in quiz_qtypes(qtype):
+            self.quiz_bank.schedule_refill(
+                topic, difficulty, refill_type,
+                submit=lambda fn: self.llm_executor.try_submit("quiz-bank-refill", fn),
+                generate=lambda refill_type=refill_type: self.generate_quiz_questions(topic, difficulty, refill_type, QUIZ_BANK_BATCH, site="quiz_refill")
+            )
+
+
+def create_llm_client():
+    # LLM_BACKEND=replay answers locally (from LLM_REPLAY_FILE recordings where they match);
+    # LLM_RECORD_FILE records live responses for later replay
+    if os.getenv("LLM_BACKEND", "groq") == "replay":
+        replay_file = os.getenv("LLM_REPLAY_FILE")
+        return ReplayLLMClient(
+            recordings=load_recordings(replay_file) if replay_file else None,
+            latency=float(os.getenv("LLM_REPLAY_LATENCY", "0")),
+            tokens_per_second=float(os.getenv("LLM_REPLAY_TPS", "0")),
+            calls=REPLAY_CALLS
+        )
+    # Shared by every session in the process so connections and the rate limiter are pooled
+    client = LLMClient(
+        api_key=os.getenv("GROQ_API_KEY"),
+        timeout=float(os.getenv("GROQ_TIMEOUT", "60")),
+        max_retries=int(os.getenv("GROQ_MAX_RETRIES", "4")),
+        requests_per_minute=float(os.getenv("GROQ_RPM", "30"))
+    )
+    if os.getenv("LLM_RECORD_FILE"):
+        client = RecordingLLMClient(client, os.getenv("LLM_RECORD_FILE"))
+    return client
+
+
+def create_metrics():
+    # OTEL_EXPORTER_OTLP_ENDPOINT (e.g. http://localhost:4318) also sends every call as a span to that collector
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    exporter = OTLPSpanExporter(endpoint, service_name=os.getenv("OTEL_SERVICE_NAME", "biotech-tutor")) if endpoint else None
+    return LLMMetrics(exporter=exporter)
+
+
+def create_service(client=None):
+    session_db = os.getenv("SESSION_DB", "data/sessions.db")
+    return TutorService(
+        client=client or create_llm_client(),
+        # Set LLM_CACHE_DB to a file path to keep responses across restarts and share them between processes
+        llm_cache=ResponseCache(
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+            db_path=os.getenv("LLM_CACHE_DB") or None
+        ),
+        llm_executor=LLMExecutor(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            per_user_limit=int(os.getenv("LLM_USER_CONCURRENCY", "3")),
+            timeout=float(os.getenv("LLM_TIMEOUT", "60"))
+        ),
+        topic_validator=TopicValidator(),
+        document_store=DocumentStore(
+            os.getenv("DOCUMENT_DIR", "data/documents"),
+            max_derived=int(os.getenv("DOCUMENT_CACHE_SIZE", "16"))
+        ),
+        session_store=SessionStore(session_db),
+        quiz_bank=QuizBank(session_db),
+        cohort_analytics=CohortAnalytics(session_db),
+        metrics=create_metrics(),
+        router=ModelRouter(load_routes(), cooldown=float(os.getenv("LLM_ROUTE_COOLDOWN", "30")))
+    )